@@ -1,5 +1,7 @@
 """LangGraph workflow definition for repository cloning."""
 
+from functools import lru_cache
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from agent.state import AgentState
 from agent.nodes import (
@@ -7,15 +9,35 @@ from agent.nodes import (
     clone_repository_node,
     analyze_repository_node,
     create_and_validate_dockerfile_node,
+    acreate_and_validate_dockerfile_node,
     copy_dependencies_node,
     should_continue,
+    should_copy_dependencies,
     should_update_dockerfile_after_deps
 )
 
+# Routing tables for conditional edges: router return value -> target node
+VALIDATE_URL_ROUTES = {
+    "clone": "clone_repository",
+    "end": END
+}
+ANALYZE_REPOSITORY_ROUTES = {
+    "copy_dependencies": "copy_dependencies",
+    "end": END
+}
+COPY_DEPENDENCIES_ROUTES = {
+    "update_dockerfile": "create_and_validate_dockerfile",
+    "end": END
+}
 
+
+@lru_cache(maxsize=1)
 def create_workflow() -> StateGraph:
     """Create the repository cloning workflow graph.
     
+    The compiled graph holds no per-run state, so it is built once and
+    shared by every caller.
+    
     Returns:
         Compiled StateGraph ready for execution
     """
@@ -26,7 +48,11 @@ def create_workflow() -> StateGraph:
     workflow.add_node("validate_url", validate_url_node)
     workflow.add_node("clone_repository", clone_repository_node)
     workflow.add_node("analyze_repository", analyze_repository_node)
-    workflow.add_node("create_and_validate_dockerfile", create_and_validate_dockerfile_node)
+    # Sync and async implementations, so both invoke and ainvoke are supported
+    workflow.add_node(
+        "create_and_validate_dockerfile",
+        RunnableLambda(create_and_validate_dockerfile_node, afunc=acreate_and_validate_dockerfile_node)
+    )
     workflow.add_node("copy_dependencies", copy_dependencies_node)
     
     # Set entry point
@@ -36,26 +62,25 @@ def create_workflow() -> StateGraph:
     workflow.add_conditional_edges(
         "validate_url",
         should_continue,
-        {
-            "clone": "clone_repository",
-            "end": END
-        }
+        VALIDATE_URL_ROUTES
     )
     
     # Add edge from clone to analyze
     workflow.add_edge("clone_repository", "analyze_repository")
     
-    # Add edge from analyze to copy_dependencies (always copy dependencies first)
-    workflow.add_edge("analyze_repository", "copy_dependencies")
+    # Add conditional edge from analyze to copy_dependencies (always copy dependencies first)
+    # or end for analyze-only runs
+    workflow.add_conditional_edges(
+        "analyze_repository",
+        should_copy_dependencies,
+        ANALYZE_REPOSITORY_ROUTES
+    )
     
     # Add conditional edge from copy_dependencies to create_and_validate_dockerfile or end
     workflow.add_conditional_edges(
         "copy_dependencies",
         should_update_dockerfile_after_deps,
-        {
-            "update_dockerfile": "create_and_validate_dockerfile",
-            "end": END
-        }
+        COPY_DEPENDENCIES_ROUTES
     )
     
     # Add edge from create_and_validate_dockerfile to end (retries are handled within the node)
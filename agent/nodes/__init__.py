@@ -3,9 +3,8 @@ from .validate_url import validate_url_node
 from .analyze_repository import analyze_repository_node
 from .update_dockerfile import update_dockerfile_node
 from .copy_dependencies import copy_dependencies_node
-from .validate_dockerfile import validate_dockerfile_node
-from .create_and_validate_dockerfile import create_and_validate_dockerfile_node
-from .conditional_node import should_continue, should_update_dockerfile, should_update_dockerfile_after_deps, should_retry_dockerfile_update
+from .create_and_validate_dockerfile import create_and_validate_dockerfile_node, acreate_and_validate_dockerfile_node
+from .conditional_node import should_continue, should_copy_dependencies, should_update_dockerfile, should_update_dockerfile_after_deps, should_retry_dockerfile_update
 # from .file_tools import parse_via_cbsfile, read_dockerfile, convert_dockerfile_to_multi_stage
 # from .workflow_tools import write_github_workflows, write_docker_argo_bake, get_context_info
 
@@ -16,9 +15,10 @@ __all__ = [
   "analyze_repository_node",
   "update_dockerfile_node",
   "copy_dependencies_node",
-  "validate_dockerfile_node",
   "create_and_validate_dockerfile_node",
+  "acreate_and_validate_dockerfile_node",
   "should_continue",
+  "should_copy_dependencies",
   "should_update_dockerfile",
   "should_update_dockerfile_after_deps",
   "should_retry_dockerfile_update"
@@ -1,14 +1,16 @@
 """Node for analyzing the cloned repository to extract ViaCBSfile and Dockerfile information."""
 
+import os
+import subprocess
 from pathlib import Path
-from langchain_core.messages import AIMessage
-from agent.state import AgentState
+from agent.state import AgentState, append_messages
+from agent.tools.git_tools import checkout_paths
 from agent.tools.analysis_tools import (
-    find_via_cbs_file,
+    DOCKERFILE_NAMES,
+    scan_root,
     read_via_cbs_file,
     parse_via_cbs_file,
-    parse_docker_bake_file,
-    find_dockerfile_in_root
+    parse_docker_bake_file
 )
 
 
@@ -28,49 +30,56 @@ def analyze_repository_node(state: AgentState) -> AgentState:
         Updated state with analysis results
     """
     clone_path = state.get("clone_path")
+    # Analyze-only clones have no working tree; files are checked out on demand
+    analyze_only = bool(state.get("analyze_only"))
+    msgs: list[str] = []
     
     if not clone_path:
         state["analysis_status"] = "error"
         state["error"] = "No clone path available for analysis"
-        state["messages"].append(
-            AIMessage(content="❌ Cannot analyze repository: No clone path available")
-        )
-        return state
+        msgs.append("❌ Cannot analyze repository: No clone path available")
+        return append_messages(state, msgs)
+    
+    # Resolve the repository root once; all paths below are built from it,
+    # so relative paths can be computed with plain string operations
+    clone_str = os.path.realpath(clone_path)
+    clone_prefix = os.path.join(clone_str, "")
     
     # Update status
     state["analysis_status"] = "pending"
-    state["messages"].append(
-        AIMessage(content="🔍 Analyzing repository structure...")
-    )
+    msgs.append("🔍 Analyzing repository structure...")
     
-    # Step 1: Find and read ViaCBSfile
-    via_cbs_file_path = find_via_cbs_file(clone_path)
+    # Step 1: Find ViaCBSfile and root Dockerfile in a single scan, then read ViaCBSfile
+    try:
+        if analyze_only:
+            checkout_paths(clone_str, ["ViaCBSfile", *DOCKERFILE_NAMES])
+        root_files = scan_root(clone_str)
+    except (OSError, subprocess.SubprocessError) as e:
+        state["analysis_status"] = "error"
+        state["error"] = f"Failed to scan repository: {str(e)}"
+        msgs.append(f"❌ Failed to scan repository: {str(e)}")
+        return append_messages(state, msgs)
+    via_cbs_file_path = root_files["via_cbs"]
     
     if not via_cbs_file_path:
         state["analysis_status"] = "error"
         state["error"] = "ViaCBSfile not found in repository"
         state["via_cbs_file_path"] = None
         state["via_cbs_file_content"] = None
-        state["messages"].append(
-            AIMessage(content="❌ ViaCBSfile not found in repository. Analysis cannot proceed.")
-        )
-        return state
+        msgs.append("❌ ViaCBSfile not found in repository. Analysis cannot proceed.")
+        return append_messages(state, msgs)
     
     # Read ViaCBSfile content
     try:
         via_cbs_content = read_via_cbs_file(via_cbs_file_path)
-        state["via_cbs_file_path"] = str(via_cbs_file_path.relative_to(clone_path))
+        state["via_cbs_file_path"] = os.path.relpath(via_cbs_file_path, clone_str)
         state["via_cbs_file_content"] = via_cbs_content
-        state["messages"].append(
-            AIMessage(content=f"✅ Found ViaCBSfile at {state['via_cbs_file_path']}")
-        )
+        msgs.append(f"✅ Found ViaCBSfile at {state['via_cbs_file_path']}")
     except Exception as e:
         state["analysis_status"] = "error"
         state["error"] = f"Failed to read ViaCBSfile: {str(e)}"
-        state["messages"].append(
-            AIMessage(content=f"❌ Failed to read ViaCBSfile: {str(e)}")
-        )
-        return state
+        msgs.append(f"❌ Failed to read ViaCBSfile: {str(e)}")
+        return append_messages(state, msgs)
     
     # Step 2: Parse ViaCBSfile
     parsed_info = parse_via_cbs_file(via_cbs_content)
@@ -81,47 +90,53 @@ def analyze_repository_node(state: AgentState) -> AgentState:
     
     if parsed_info["docker_bake_file"]:
         # If dockerBakeFile is specified, read it and extract dockerfile path
-        repo_dir = Path(clone_path)
+        repo_dir = Path(clone_str)
         # Remove leading ./ if present
         bake_file_relative = parsed_info["docker_bake_file"]
         if bake_file_relative.startswith('./'):
             bake_file_relative = bake_file_relative[2:]
         bake_file_path = repo_dir / bake_file_relative
+        if analyze_only:
+            try:
+                checkout_paths(clone_str, [bake_file_relative])
+            except (OSError, subprocess.SubprocessError) as e:
+                state["analysis_status"] = "error"
+                state["error"] = f"Failed to check out docker-bake file: {str(e)}"
+                msgs.append(f"❌ Failed to check out docker-bake file: {str(e)}")
+                return append_messages(state, msgs)
         
         if bake_file_path.exists():
-            docker_bake_file_path = str(bake_file_path.relative_to(clone_path))
+            docker_bake_file_path = os.path.relpath(bake_file_path, clone_str)
             state["docker_bake_file_path"] = docker_bake_file_path
-            state["messages"].append(
-                AIMessage(content=f"✅ Found docker-bake file at {docker_bake_file_path}")
-            )
+            msgs.append(f"✅ Found docker-bake file at {docker_bake_file_path}")
             
             # Parse docker-bake.hcl to find dockerfile path
             dockerfile_from_bake = parse_docker_bake_file(bake_file_path)
             if dockerfile_from_bake:
                 # Resolve relative path from bake file location
-                bake_dir = bake_file_path.parent
-                resolved_dockerfile = bake_dir / dockerfile_from_bake
                 # Normalize the path (resolve relative paths like ../)
-                resolved_dockerfile = resolved_dockerfile.resolve()
-                repo_dir_path = Path(clone_path).resolve()
+                resolved_dockerfile = os.path.realpath(
+                    os.path.join(os.fspath(bake_file_path.parent), dockerfile_from_bake)
+                )
                 
                 # Check if the resolved dockerfile is within the repo directory
-                try:
-                    relative_dockerfile = resolved_dockerfile.relative_to(repo_dir_path)
-                    if resolved_dockerfile.exists():
-                        dockerfile_path = str(relative_dockerfile)
-                        state["messages"].append(
-                            AIMessage(content=f"✅ Found Dockerfile path from bake file: {dockerfile_path}")
-                        )
-                except ValueError:
+                if resolved_dockerfile.startswith(clone_prefix):
+                    if analyze_only:
+                        try:
+                            checkout_paths(clone_str, [resolved_dockerfile[len(clone_prefix):]])
+                        except (OSError, subprocess.SubprocessError) as e:
+                            state["analysis_status"] = "error"
+                            state["error"] = f"Failed to check out Dockerfile: {str(e)}"
+                            msgs.append(f"❌ Failed to check out Dockerfile: {str(e)}")
+                            return append_messages(state, msgs)
+                    if os.path.exists(resolved_dockerfile):
+                        dockerfile_path = resolved_dockerfile[len(clone_prefix):]
+                        msgs.append(f"✅ Found Dockerfile path from bake file: {dockerfile_path}")
+                else:
                     # Dockerfile path is outside the repository
-                    state["messages"].append(
-                        AIMessage(content=f"⚠️ Dockerfile path from bake file is outside repository: {dockerfile_from_bake}")
-                    )
+                    msgs.append(f"⚠️ Dockerfile path from bake file is outside repository: {dockerfile_from_bake}")
         else:
-            state["messages"].append(
-                AIMessage(content=f"⚠️ docker-bake file specified but not found: {parsed_info['docker_bake_file']}")
-            )
+            msgs.append(f"⚠️ docker-bake file specified but not found: {parsed_info['docker_bake_file']}")
     
     # If no dockerfile found yet, check root
     # This handles cases where:
@@ -129,45 +144,33 @@ def analyze_repository_node(state: AgentState) -> AgentState:
     # 2. dockerBakeFile was specified but dockerfile path wasn't found in it
     # 3. docker specification exists but no dockerBakeFile was specified
     if not dockerfile_path:
-        root_dockerfile = find_dockerfile_in_root(clone_path)
+        root_dockerfile = root_files["dockerfile"]
         if root_dockerfile:
-            dockerfile_path = str(root_dockerfile.relative_to(clone_path))
-            state["messages"].append(
-                AIMessage(content=f"✅ Found Dockerfile in repository root: {dockerfile_path}")
-            )
+            dockerfile_path = os.path.relpath(root_dockerfile, clone_str)
+            msgs.append(f"✅ Found Dockerfile in repository root: {dockerfile_path}")
         else:
-            state["messages"].append(
-                AIMessage(content="⚠️ No Dockerfile found in repository root")
-            )
+            msgs.append("⚠️ No Dockerfile found in repository root")
     
     # Step 4: Extract build platform and config from buildAs
     build_platform = parsed_info.get("build_platform")
     build_as_config = parsed_info.get("build_as_config")
     if build_platform:
         state["build_platform"] = build_platform
-        state["messages"].append(
-            AIMessage(content=f"✅ Identified build platform: {build_platform}")
-        )
+        msgs.append(f"✅ Identified build platform: {build_platform}")
         if build_as_config:
             state["build_as_config"] = build_as_config
-            state["messages"].append(
-                AIMessage(content=f"✅ Extracted buildAs configuration: {build_as_config}")
-            )
+            msgs.append(f"✅ Extracted buildAs configuration: {build_as_config}")
     else:
         state["build_platform"] = None
         state["build_as_config"] = None
-        state["messages"].append(
-            AIMessage(content="ℹ️ No buildAs argument found in ViaCBSfile")
-        )
+        msgs.append("ℹ️ No buildAs argument found in ViaCBSfile")
     
     # Update state with dockerfile path
     state["dockerfile_path"] = dockerfile_path
     
     # Mark analysis as successful
     state["analysis_status"] = "success"
-    state["messages"].append(
-        AIMessage(content="✅ Repository analysis completed successfully")
-    )
+    msgs.append("✅ Repository analysis completed successfully")
     
-    return state
+    return append_messages(state, msgs)
 
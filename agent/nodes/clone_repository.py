@@ -1,11 +1,14 @@
 from langchain_core.messages import AIMessage
 from agent.state import AgentState
-from agent.tools import clone_repository
+from agent.tools import clone_repository, start_buildx_builder_warmup
 
 
 def clone_repository_node(state: AgentState) -> AgentState:
     """Clone the repository.
     
+    Unless only analyzing, the buildx builder used for validation is
+    bootstrapped in the background while the clone runs.
+    
     Args:
         state: Current agent state
         
@@ -13,6 +16,8 @@ def clone_repository_node(state: AgentState) -> AgentState:
         Updated state with clone result
     """
     repository_url = state.get("repository_url", "")
+    need_full_history = bool(state.get("need_full_history"))
+    analyze_only = bool(state.get("analyze_only"))
     
     # Update status
     state["status"] = "cloning"
@@ -20,8 +25,17 @@ def clone_repository_node(state: AgentState) -> AgentState:
         AIMessage(content=f"🔄 Cloning repository from {repository_url}...")
     )
     
+    # Validation needs a running BuildKit builder; start it while the clone runs
+    if not analyze_only:
+        start_buildx_builder_warmup()
+    
     # Perform clone
-    result = clone_repository(repository_url, "./workspace/")
+    result = clone_repository(
+        repository_url,
+        "./workspace/",
+        full_history=need_full_history,
+        analyze_only=analyze_only
+    )
     
     if result["success"]:
         state["status"] = "success"
@@ -38,4 +52,3 @@ def clone_repository_node(state: AgentState) -> AgentState:
         )
     
     return state
-
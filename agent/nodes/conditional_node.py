@@ -1,6 +1,13 @@
 from typing import Literal
 from agent.state import AgentState
 
+# Routing tables: state value -> next step
+_CONTINUE_ROUTES = {"validated": "clone", "success": "end", "error": "end"}
+_COPY_DEPENDENCIES_ROUTES = {True: "end", False: "copy_dependencies"}
+_UPDATE_DOCKERFILE_ROUTES = {True: "update_dockerfile", False: "copy_dependencies"}
+_UPDATE_DOCKERFILE_AFTER_DEPS_ROUTES = {True: "update_dockerfile", False: "end"}
+_RETRY_DOCKERFILE_ROUTES = {True: "update_dockerfile", False: "end"}
+
 def should_continue(state: AgentState) -> Literal["clone", "end"]:
     """Determine the next step in the workflow.
     
@@ -10,14 +17,19 @@ def should_continue(state: AgentState) -> Literal["clone", "end"]:
     Returns:
         Next node to execute
     """
-    status = state.get("status", "")
+    return _CONTINUE_ROUTES.get(state.get("status", ""), "end")
+
+
+def should_copy_dependencies(state: AgentState) -> Literal["copy_dependencies", "end"]:
+    """Determine if dependencies should be copied after analysis.
     
-    if status == "validated":
-        return "clone"
-    elif status in ["success", "error"]:
-        return "end"
-    else:
-        return "end"
+    Args:
+        state: Current agent state
+        
+    Returns:
+        "end" for analyze-only runs (there is no working tree), "copy_dependencies" otherwise
+    """
+    return _COPY_DEPENDENCIES_ROUTES[bool(state.get("analyze_only"))]
 
 
 def should_update_dockerfile(state: AgentState) -> Literal["update_dockerfile", "copy_dependencies"]:
@@ -29,12 +41,7 @@ def should_update_dockerfile(state: AgentState) -> Literal["update_dockerfile",
     Returns:
         "update_dockerfile" if build_platform has a value, "copy_dependencies" otherwise
     """
-    build_platform = state.get("build_platform")
-    
-    if build_platform:
-        return "update_dockerfile"
-    else:
-        return "copy_dependencies"
+    return _UPDATE_DOCKERFILE_ROUTES[bool(state.get("build_platform"))]
 
 
 def should_update_dockerfile_after_deps(state: AgentState) -> Literal["update_dockerfile", "end"]:
@@ -46,12 +53,7 @@ def should_update_dockerfile_after_deps(state: AgentState) -> Literal["update_do
     Returns:
         "update_dockerfile" if build_platform has a value, "end" otherwise
     """
-    build_platform = state.get("build_platform")
-    
-    if build_platform:
-        return "update_dockerfile"
-    else:
-        return "end"
+    return _UPDATE_DOCKERFILE_AFTER_DEPS_ROUTES[bool(state.get("build_platform"))]
 
 
 def should_retry_dockerfile_update(state: AgentState) -> Literal["update_dockerfile", "end"]:
@@ -63,18 +65,12 @@ def should_retry_dockerfile_update(state: AgentState) -> Literal["update_dockerf
     Returns:
         "update_dockerfile" if validation failed and retry limit not reached, "end" otherwise
     """
-    validation_passed = state.get("dockerfile_validation_passed")
-    retry_count = state.get("dockerfile_validation_retry_count", 0)
-    max_retries = state.get("dockerfile_validation_max_retries", 2)
-    
     # If validation passed, end
-    if validation_passed:
+    if state.get("dockerfile_validation_passed"):
         return "end"
     
-    # If validation failed but we haven't exceeded max retries, retry
-    if retry_count < max_retries:
-        return "update_dockerfile"
-    
-    # If we've exceeded max retries, end
-    return "end"
+    # Retry only while we haven't exceeded max retries
+    retry_count = state.get("dockerfile_validation_retry_count", 0)
+    max_retries = state.get("dockerfile_validation_max_retries", 2)
+    return _RETRY_DOCKERFILE_ROUTES[retry_count < max_retries]
 
@@ -1,10 +1,117 @@
 """Node for copying and rendering dependency templates to the cloned repository."""
 
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from jinja2 import Environment, BaseLoader
-from langchain_core.messages import AIMessage
-from agent.state import AgentState
+from jinja2 import Environment, DictLoader
+from agent.state import AgentState, append_messages
+from agent.tools.docker_tools import get_dockerfile_argo_path
+
+DEPENDENCIES_PATH = Path(__file__).resolve().parent.parent.parent / "dependencies"
+
+
+def _load_dependency_templates() -> dict[str, str]:
+    """Read all dependency templates, keyed by "<group>/<file name>"."""
+    templates = {}
+    for group in ("gha", "docker"):
+        with os.scandir(DEPENDENCIES_PATH / group) as it:
+            entries = sorted(
+                (entry for entry in it if entry.name.endswith(".tpl") and entry.is_file()),
+                key=lambda entry: entry.name
+            )
+        for entry in entries:
+            with open(entry.path, "rb") as f:
+                templates[f"{group}/{entry.name}"] = f.read().decode("utf-8")
+    return templates
+
+
+_DEPENDENCY_TEMPLATES = _load_dependency_templates()
+
+# (template name, output file name without the .tpl extension) for each group
+_GHA_TEMPLATES = tuple(
+    (name, name[len("gha/"):-len(".tpl")]) for name in _DEPENDENCY_TEMPLATES if name.startswith("gha/")
+)
+_DOCKER_TEMPLATES = tuple(
+    (name, name[len("docker/"):-len(".tpl")]) for name in _DEPENDENCY_TEMPLATES if name.startswith("docker/")
+)
+
+# Jinja2 environment with custom delimiters [[ ]] instead of {{ }}.
+# Templates are loaded once and compiled templates are never evicted.
+_JINJA_ENV = Environment(
+    loader=DictLoader(_DEPENDENCY_TEMPLATES),
+    variable_start_string='[[',
+    variable_end_string=']]',
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+    cache_size=-1
+)
+
+# Templates that only substitute [[ name ]] placeholders are rendered with a
+# single regex substitution; anything using other Jinja syntax goes through Jinja
+_PLACEHOLDER_PATTERN = re.compile(r"\[\[\s*(\w+)\s*\]\]")
+
+
+def _compile_simple_template(template_content: str) -> tuple[str, frozenset[str]] | None:
+    """Prepare a template for placeholder-only rendering.
+    
+    Args:
+        template_content: Raw template content
+        
+    Returns:
+        Tuple of (template text, placeholder names), or None if the template
+        uses Jinja syntax beyond simple [[ name ]] placeholders
+    """
+    if "{%" in template_content or "{#" in template_content or "\r" in template_content:
+        return None
+    if "[[" in _PLACEHOLDER_PATTERN.sub("", template_content):
+        return None
+    # Jinja drops a single trailing newline (keep_trailing_newline=False)
+    if template_content.endswith("\n"):
+        template_content = template_content[:-1]
+    names = frozenset(_PLACEHOLDER_PATTERN.findall(template_content))
+    return template_content, names
+
+
+_SIMPLE_TEMPLATES = {
+    name: simple
+    for name, content in _DEPENDENCY_TEMPLATES.items()
+    if (simple := _compile_simple_template(content)) is not None
+}
+
+
+def render_dependency_template(template_name: str, context: dict) -> str:
+    """Render a preloaded dependency template.
+    
+    Args:
+        template_name: Template name in "<group>/<file name>" form
+        context: Dictionary of variables to substitute
+        
+    Returns:
+        Rendered template content
+    """
+    simple = _SIMPLE_TEMPLATES.get(template_name)
+    if simple is not None and simple[1] <= context.keys():
+        template_content, _ = simple
+        return _PLACEHOLDER_PATTERN.sub(lambda match: str(context[match.group(1)]), template_content)
+    return _JINJA_ENV.get_template(template_name).render(**context)
+
+
+# Status prefixes for progress messages
+_OK = "✅ "
+_ERR = "❌ "
+_INFO = "📋 "
+_FOLDER = "📁 "
+
+# Rendered templates are independent files, so their writes are overlapped
+_write_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dependency-write")
+
+# Patterns to extract org/repo from various URL formats
+_GITHUB_URL_PATTERNS = (
+    re.compile(r"github\.com[:/]([^/]+)/([^/]+?)(?:\.git)?/?$"),  # https://github.com/org/repo or git@github.com:org/repo.git
+    re.compile(r"([^/]+)/([^/]+?)(?:\.git)?$"),  # Fallback for org/repo
+)
 
 
 def parse_github_url(github_url: str) -> tuple[str, str]:
@@ -32,14 +139,8 @@ def parse_github_url(github_url: str) -> tuple[str, str]:
             return parts[0], parts[1].replace(".git", "")
     
     # Handle full URLs
-    # Extract org/repo from various URL formats
-    patterns = [
-        r"github\.com[:/]([^/]+)/([^/]+?)(?:\.git)?/?$",  # https://github.com/org/repo or git@github.com:org/repo.git
-        r"([^/]+)/([^/]+?)(?:\.git)?$",  # Fallback for org/repo
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, github_url)
+    for pattern in _GITHUB_URL_PATTERNS:
+        match = pattern.search(github_url)
         if match:
             org = match.group(1)
             repo = match.group(2).replace(".git", "")
@@ -58,19 +159,35 @@ def render_template(template_content: str, context: dict) -> str:
     Returns:
         Rendered template content
     """
-    # Create Jinja2 environment with custom delimiters
-    env = Environment(
-        loader=BaseLoader(),
-        variable_start_string='[[',
-        variable_end_string=']]',
-        trim_blocks=True,
-        lstrip_blocks=True
-    )
-    
-    template = env.from_string(template_content)
+    template = _JINJA_ENV.from_string(template_content)
     return template.render(**context)
 
 
+def _write_file(output: tuple[Path, str]) -> None:
+    """Write a single rendered template to its output path."""
+    output_path, content = output
+    data = memoryview(content.encode("utf-8"))
+    fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
+def write_rendered_files(outputs: list[tuple[Path, str]]) -> None:
+    """Write rendered templates to disk concurrently.
+    
+    Args:
+        outputs: List of (output_path, rendered_content) tuples
+        
+    Raises:
+        Exception: The first error raised while writing any of the files
+    """
+    # Consume the iterator so that write errors are raised here
+    list(_write_executor.map(_write_file, outputs))
+
+
 def copy_dependencies_node(state: AgentState) -> AgentState:
     """Copy and render dependency templates to the cloned repository.
     
@@ -89,58 +206,39 @@ def copy_dependencies_node(state: AgentState) -> AgentState:
     clone_path = state.get("clone_path")
     repository_url = state.get("repository_url", "")
     dockerfile_path = state.get("dockerfile_path")
+    msgs: list[str] = []
     
     # Validate required state
     if not clone_path:
         state["error"] = "No clone path available for copying dependencies"
-        state["messages"].append(
-            AIMessage(content="❌ Cannot copy dependencies: No clone path available")
-        )
-        return state
+        msgs.append(_ERR + "Cannot copy dependencies: No clone path available")
+        return append_messages(state, msgs)
     
     if not repository_url:
         state["error"] = "No repository URL available"
-        state["messages"].append(
-            AIMessage(content="❌ Cannot copy dependencies: No repository URL available")
-        )
-        return state
+        msgs.append(_ERR + "Cannot copy dependencies: No repository URL available")
+        return append_messages(state, msgs)
     
     if not dockerfile_path:
         state["error"] = "No dockerfile_path available"
-        state["messages"].append(
-            AIMessage(content="❌ Cannot copy dependencies: No dockerfile_path in state")
-        )
-        return state
+        msgs.append(_ERR + "Cannot copy dependencies: No dockerfile_path in state")
+        return append_messages(state, msgs)
     
     # Parse GitHub URL
     try:
         github_org, repo_name = parse_github_url(repository_url)
-        state["messages"].append(
-            AIMessage(content=f"📋 Parsed GitHub URL: org={github_org}, repo={repo_name}")
-        )
+        msgs.append(f"{_INFO}Parsed GitHub URL: org={github_org}, repo={repo_name}")
     except ValueError as e:
         state["error"] = str(e)
-        state["messages"].append(
-            AIMessage(content=f"❌ Failed to parse GitHub URL: {str(e)}")
-        )
-        return state
+        msgs.append(_ERR + "Failed to parse GitHub URL: " + str(e))
+        return append_messages(state, msgs)
     
     # Determine the dockerfile path to use in templates
     # Prefer dockerfile_argo_path if available, otherwise construct it from dockerfile_path
     dockerfile_path_for_template = state.get("dockerfile_argo_path")
     if not dockerfile_path_for_template:
         # Construct -argo path from original dockerfile_path
-        dockerfile_path_obj = Path(dockerfile_path)
-        if dockerfile_path_obj.suffix:
-            dockerfile_argo_name = dockerfile_path_obj.stem + "-argo" + dockerfile_path_obj.suffix
-        else:
-            dockerfile_argo_name = dockerfile_path_obj.name + "-argo"
-        
-        # Build the path: if parent is ".", just use the name, otherwise use parent/name
-        if dockerfile_path_obj.parent == Path("."):
-            dockerfile_path_for_template = dockerfile_argo_name
-        else:
-            dockerfile_path_for_template = str(dockerfile_path_obj.parent / dockerfile_argo_name)
+        dockerfile_path_for_template = get_dockerfile_argo_path(dockerfile_path)
     
     # Prepare template context
     context = {
@@ -151,83 +249,65 @@ def copy_dependencies_node(state: AgentState) -> AgentState:
     
     # Get paths
     clone_path_obj = Path(clone_path)
-    dependencies_path = Path(__file__).parent.parent.parent / "dependencies"
     workflows_dir = clone_path_obj / ".github" / "workflows"
     
     # Create .github/workflows directory if it doesn't exist
     try:
         workflows_dir.mkdir(parents=True, exist_ok=True)
-        state["messages"].append(
-            AIMessage(content=f"📁 Created/verified .github/workflows directory")
-        )
+        msgs.append(_FOLDER + "Created/verified .github/workflows directory")
     except Exception as e:
         state["error"] = f"Failed to create .github/workflows directory: {str(e)}"
-        state["messages"].append(
-            AIMessage(content=f"❌ Failed to create .github/workflows directory: {str(e)}")
-        )
-        return state
+        msgs.append(_ERR + "Failed to create .github/workflows directory: " + str(e))
+        return append_messages(state, msgs)
     
     # Copy and render GHA templates
-    gha_templates_dir = dependencies_path / "gha"
     copied_files = []
     
     try:
-        for template_file in gha_templates_dir.glob("*.tpl"):
-            # Read template
-            template_content = template_file.read_text()
-            
-            # Render template
-            rendered_content = render_template(template_content, context)
-            
+        outputs = []
+        rendered_filenames = []
+        for template_name, output_filename in _GHA_TEMPLATES:
             # Write to .github/workflows/ without .tpl extension
-            output_filename = template_file.stem  # Removes .tpl extension
             output_path = workflows_dir / output_filename
             
-            output_path.write_text(rendered_content)
+            # Render the preloaded template in memory
+            outputs.append((output_path, render_dependency_template(template_name, context)))
+            rendered_filenames.append(output_filename)
+        
+        write_rendered_files(outputs)
+        
+        for output_filename in rendered_filenames:
             copied_files.append(f".github/workflows/{output_filename}")
-            
-            state["messages"].append(
-                AIMessage(content=f"✅ Copied and rendered {output_filename}")
-            )
+            msgs.append(_OK + "Copied and rendered " + output_filename)
     except Exception as e:
         state["error"] = f"Failed to copy GHA templates: {str(e)}"
-        state["messages"].append(
-            AIMessage(content=f"❌ Failed to copy GHA templates: {str(e)}")
-        )
-        return state
+        msgs.append(_ERR + "Failed to copy GHA templates: " + str(e))
+        return append_messages(state, msgs)
     
     # Copy and render Docker template
-    docker_templates_dir = dependencies_path / "docker"
-    
     try:
-        for template_file in docker_templates_dir.glob("*.tpl"):
-            # Read template
-            template_content = template_file.read_text()
-            
-            # Render template
-            rendered_content = render_template(template_content, context)
-            
+        outputs = []
+        rendered_filenames = []
+        for template_name, output_filename in _DOCKER_TEMPLATES:
             # Write to root without .tpl extension
-            output_filename = template_file.stem  # Removes .tpl extension
             output_path = clone_path_obj / output_filename
             
-            output_path.write_text(rendered_content)
+            # Render the preloaded template in memory
+            outputs.append((output_path, render_dependency_template(template_name, context)))
+            rendered_filenames.append(output_filename)
+        
+        write_rendered_files(outputs)
+        
+        for output_filename in rendered_filenames:
             copied_files.append(output_filename)
-            
-            state["messages"].append(
-                AIMessage(content=f"✅ Copied and rendered {output_filename} to root")
-            )
+            msgs.append(_OK + "Copied and rendered " + output_filename + " to root")
     except Exception as e:
         state["error"] = f"Failed to copy Docker template: {str(e)}"
-        state["messages"].append(
-            AIMessage(content=f"❌ Failed to copy Docker template: {str(e)}")
-        )
-        return state
+        msgs.append(_ERR + "Failed to copy Docker template: " + str(e))
+        return append_messages(state, msgs)
     
     # Success message
-    state["messages"].append(
-        AIMessage(content=f"✅ Successfully copied {len(copied_files)} dependency files: {', '.join(copied_files)}")
-    )
+    msgs.append(f"{_OK}Successfully copied {len(copied_files)} dependency files: {', '.join(copied_files)}")
     
-    return state
+    return append_messages(state, msgs)
 
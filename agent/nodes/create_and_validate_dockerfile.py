@@ -1,27 +1,91 @@
 """Combined node for creating and validating Dockerfile with retry logic."""
 
-import subprocess
+import asyncio
+import hashlib
+import re
 from pathlib import Path
-from langchain_core.messages import AIMessage
-from agent.state import AgentState
+from agent.state import AgentState, append_messages
 from agent.tools.docker_tools import (
     read_dockerfile,
     is_multi_stage_dockerfile,
-    write_dockerfile_argo
+    get_dockerfile_argo_path,
+    try_mechanical_multi_stage,
+    write_dockerfile_argo,
+    write_text_atomic,
+    get_buildx_cache_dir,
+    run_cached_buildx_bake,
+    run_coroutine_sync
 )
-from agent.tools.llm_tools import convert_dockerfile_to_multi_stage
+
+
+# Validation errors the nodes report themselves when the build environment,
+# not the Dockerfile, is at fault
+_INFRA_ERROR_PREFIXES = (
+    "docker buildx not found",
+    "unexpected error during validation"
+)
+
+# Docker daemon and buildx error lines, optionally behind a BuildKit step prefix
+# such as "#5 " or "#5 0.123 "
+_ERROR_LINE_PATTERN = re.compile(
+    r'^(?:#\d+ (?:[\d.]+ )?)?((?:error:|error response from daemon:|cannot connect to the docker daemon).*)$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Causes on those error lines that point at the build environment. Only error
+# lines are checked, so build output such as `pip install --timeout 60` or
+# `curl --connect-timeout 5` never counts as an infrastructure failure
+_INFRA_ERROR_MARKERS = (
+    "cannot connect to the docker daemon",
+    "connection refused",
+    "no space left on device",
+    "i/o timeout",
+    "tls handshake timeout",
+    "context deadline exceeded"
+)
+
+
+def _is_content_error(validation_error: str) -> bool:
+    """Check whether a validation error is worth asking the LLM to fix.
+    
+    Args:
+        validation_error: Error output from the failed validation
+        
+    Returns:
+        False if the error points at the build environment (docker missing,
+        daemon unreachable, network timeouts), True otherwise
+    """
+    if validation_error.strip().lower().startswith(_INFRA_ERROR_PREFIXES):
+        return False
+    for error_line in _ERROR_LINE_PATTERN.findall(validation_error):
+        lowered = error_line.lower()
+        if any(marker in lowered for marker in _INFRA_ERROR_MARKERS):
+            return False
+    return True
 
 
 def create_and_validate_dockerfile_node(state: AgentState) -> AgentState:
+    """Synchronous entry point for acreate_and_validate_dockerfile_node.
+    
+    Args:
+        state: Current agent state
+        
+    Returns:
+        Updated state with dockerfile_updated and validation results
+    """
+    return run_coroutine_sync(acreate_and_validate_dockerfile_node(state))
+
+
+async def acreate_and_validate_dockerfile_node(state: AgentState) -> AgentState:
     """Create and validate Dockerfile in a single node with retry logic.
     
     This node:
     1. Checks if build_platform has a value
     2. Reads the existing Dockerfile
     3. Checks if it's already multi-stage
-    4. If not, converts it to multi-stage using LLM
+    4. If not, converts it to multi-stage using LLM (in a worker thread)
     5. Writes the updated Dockerfile as Dockerfile-argo
-    6. Validates the Dockerfile using docker buildx bake
+    6. Validates the Dockerfile using docker buildx bake, without blocking the event loop
     7. Retries up to max_retries times if validation fails
     
     Args:
@@ -43,213 +107,225 @@ def create_and_validate_dockerfile_node(state: AgentState) -> AgentState:
         state["dockerfile_validation_max_retries"] = 2  # Default to 2 retries
     
     max_retries = state.get("dockerfile_validation_max_retries", 2)
+    msgs: list[str] = []
     
     # Check if build_platform has a value
     if not build_platform:
         state["dockerfile_updated"] = False
         state["dockerfile_validation_passed"] = False
-        state["messages"].append(
-            AIMessage(content="⚠️ No build_platform found. Skipping Dockerfile update.")
-        )
-        return state
+        msgs.append("⚠️ No build_platform found. Skipping Dockerfile update.")
+        return append_messages(state, msgs)
     
     # Check if clone_path and dockerfile_path are available
     if not clone_path:
         state["dockerfile_updated"] = False
         state["dockerfile_validation_passed"] = False
         state["error"] = "No clone path available for Dockerfile update"
-        state["messages"].append(
-            AIMessage(content="❌ Cannot update Dockerfile: No clone path available")
-        )
-        return state
+        msgs.append("❌ Cannot update Dockerfile: No clone path available")
+        return append_messages(state, msgs)
     
     if not dockerfile_path:
         state["dockerfile_updated"] = False
         state["dockerfile_validation_passed"] = False
         state["error"] = "No Dockerfile path found"
-        state["messages"].append(
-            AIMessage(content="❌ Cannot update Dockerfile: No Dockerfile found in repository")
-        )
-        return state
+        msgs.append("❌ Cannot update Dockerfile: No Dockerfile found in repository")
+        return append_messages(state, msgs)
     
     # Retry loop: create and validate until success or max retries reached
-    retry_count = state.get("dockerfile_validation_retry_count", 0)
+    start_retry_count = state.get("dockerfile_validation_retry_count", 0)
     validation_error = None
+    # Content of the Dockerfile being worked on; only read from disk on first
+    # entry, afterwards it is whatever this node last wrote to Dockerfile-argo
+    dockerfile_content = None
+    clone_path_obj = Path(clone_path)
+    original_dockerfile_path = clone_path_obj / dockerfile_path
+    # Layer cache shared by all bake attempts for this repository
+    buildx_cache_dir = get_buildx_cache_dir(clone_path_obj)
+    # Bake file location, resolved and checked once for a given Dockerfile-argo
+    # path: (argo path, bake file path, whether it exists)
+    bake_location = None
+    # sha256 of Dockerfile content -> validation error, for builds whose Dockerfile
+    # already failed validation
+    failed_builds: dict[str, str] = {}
     
-    while retry_count <= max_retries:
-        # Step 1: Read Dockerfile (original or existing -argo file if retrying)
+    for retry_count in range(start_retry_count, max_retries + 1):
+        # Step 1: Locate Dockerfile (original or existing -argo file if retrying)
         if retry_count > 0 and validation_error:
             # Retry: read from existing -argo file
             dockerfile_argo_path = state.get("dockerfile_argo_path")
             if dockerfile_argo_path:
-                full_dockerfile_path = Path(clone_path) / dockerfile_argo_path
-                state["messages"].append(
-                    AIMessage(content=f"🔄 Retry attempt {retry_count}/{max_retries}: Reading existing Dockerfile-argo at {dockerfile_argo_path}...")
-                )
+                full_dockerfile_path = clone_path_obj / dockerfile_argo_path
+                msgs.append(f"🔄 Retry attempt {retry_count}/{max_retries}: Using existing Dockerfile-argo at {dockerfile_argo_path}...")
             else:
                 # Fallback to original if -argo path not set
-                full_dockerfile_path = Path(clone_path) / dockerfile_path
-                state["messages"].append(
-                    AIMessage(content=f"🔄 Retry attempt {retry_count}/{max_retries}: Reading Dockerfile at {dockerfile_path}...")
-                )
+                full_dockerfile_path = original_dockerfile_path
+                msgs.append(f"🔄 Retry attempt {retry_count}/{max_retries}: Using Dockerfile at {dockerfile_path}...")
         else:
             # First attempt: read from original Dockerfile
-            full_dockerfile_path = Path(clone_path) / dockerfile_path
-            state["messages"].append(
-                AIMessage(content=f"🔍 Checking Dockerfile at {dockerfile_path}...")
-            )
+            full_dockerfile_path = original_dockerfile_path
+            msgs.append(f"🔍 Checking Dockerfile at {dockerfile_path}...")
         
-        # Read the Dockerfile
-        try:
-            dockerfile_content = read_dockerfile(str(full_dockerfile_path))
-            if dockerfile_content is None:
+        # Read the Dockerfile (only on first entry; retries reuse the content written below)
+        if dockerfile_content is None:
+            try:
+                dockerfile_content = read_dockerfile(full_dockerfile_path)
+                if dockerfile_content is None:
+                    state["dockerfile_updated"] = False
+                    state["dockerfile_validation_passed"] = False
+                    state["error"] = f"Dockerfile not found at {full_dockerfile_path}"
+                    msgs.append(f"❌ Dockerfile not found at {full_dockerfile_path}")
+                    return append_messages(state, msgs)
+            except Exception as e:
                 state["dockerfile_updated"] = False
                 state["dockerfile_validation_passed"] = False
-                state["error"] = f"Dockerfile not found at {full_dockerfile_path}"
-                state["messages"].append(
-                    AIMessage(content=f"❌ Dockerfile not found at {full_dockerfile_path}")
-                )
-                return state
-        except Exception as e:
-            state["dockerfile_updated"] = False
-            state["dockerfile_validation_passed"] = False
-            state["error"] = f"Failed to read Dockerfile: {str(e)}"
-            state["messages"].append(
-                AIMessage(content=f"❌ Failed to read Dockerfile: {str(e)}")
-            )
-            return state
+                state["error"] = f"Failed to read Dockerfile: {str(e)}"
+                msgs.append(f"❌ Failed to read Dockerfile: {str(e)}")
+                return append_messages(state, msgs)
         
-        # Step 2: Check if Dockerfile is already multi-stage (only on first attempt)
-        if retry_count == 0 and is_multi_stage_dockerfile(dockerfile_content) and not validation_error:
+        # Step 2: Check if Dockerfile is already multi-stage (only on first attempt;
+        # the cheap checks come first so retries never scan the content)
+        if validation_error and state.get("dockerfile_argo_path") and not _is_content_error(validation_error):
+            # The last failure was not caused by the Dockerfile, so validate the
+            # existing Dockerfile-argo again instead of converting it
+            msgs.append("🔄 Previous validation failure was not caused by the Dockerfile. Validating Dockerfile-argo again without conversion...")
+        elif retry_count == 0 and not validation_error and is_multi_stage_dockerfile(dockerfile_content):
             # If already multi-stage, create the -argo file by copying the content
-            dockerfile_path_obj = Path(dockerfile_path)
-            if dockerfile_path_obj.suffix:
-                dockerfile_argo_name = dockerfile_path_obj.stem + "-argo" + dockerfile_path_obj.suffix
-            else:
-                dockerfile_argo_name = dockerfile_path_obj.name + "-argo"
-            
-            # Build the path: if parent is ".", just use the name, otherwise use parent/name
-            if dockerfile_path_obj.parent == Path("."):
-                dockerfile_argo_path_str = dockerfile_argo_name
-            else:
-                dockerfile_argo_path_str = str(dockerfile_path_obj.parent / dockerfile_argo_name)
+            dockerfile_argo_path_str = get_dockerfile_argo_path(dockerfile_path)
             
             # Create the -argo file with the existing multi-stage content
             try:
-                dockerfile_argo_path_full = Path(clone_path) / dockerfile_argo_path_str
-                dockerfile_argo_path_full.write_text(dockerfile_content, encoding='utf-8')
+                dockerfile_argo_path_full = clone_path_obj / dockerfile_argo_path_str
+                write_text_atomic(dockerfile_argo_path_full, dockerfile_content)
                 state["dockerfile_argo_path"] = dockerfile_argo_path_str
                 state["dockerfile_updated"] = True
-                state["messages"].append(
-                    AIMessage(content=f"✅ Dockerfile is already multi-stage. Created Dockerfile-argo at {dockerfile_argo_path_str} for validation.")
-                )
+                msgs.append(f"✅ Dockerfile is already multi-stage. Created Dockerfile-argo at {dockerfile_argo_path_str} for validation.")
             except Exception as e:
                 state["dockerfile_updated"] = False
                 state["dockerfile_validation_passed"] = False
                 state["error"] = f"Failed to create Dockerfile-argo: {str(e)}"
-                state["messages"].append(
-                    AIMessage(content=f"❌ Failed to create Dockerfile-argo: {str(e)}")
-                )
-                return state
+                msgs.append(f"❌ Failed to create Dockerfile-argo: {str(e)}")
+                return append_messages(state, msgs)
         else:
             # Step 3: Convert to multi-stage (or retry with error context)
             if retry_count > 0:
-                state["messages"].append(
-                    AIMessage(content=f"🔄 Retrying Dockerfile conversion (attempt {retry_count + 1}/{max_retries + 1}) with validation error context...")
-                )
+                msgs.append(f"🔄 Retrying Dockerfile conversion (attempt {retry_count + 1}/{max_retries + 1}) with validation error context...")
             else:
-                state["messages"].append(
-                    AIMessage(content=f"🔄 Converting Dockerfile to multi-stage format using build platform: {build_platform}...")
-                )
+                msgs.append(f"🔄 Converting Dockerfile to multi-stage format using build platform: {build_platform}...")
             
-            try:
-                updated_dockerfile_content = convert_dockerfile_to_multi_stage(
-                    dockerfile_content,
-                    build_platform,
-                    build_as_config,
-                    validation_error
-                )
-            except Exception as e:
-                state["dockerfile_updated"] = False
-                state["dockerfile_validation_passed"] = False
-                state["error"] = f"Failed to convert Dockerfile using LLM: {str(e)}"
-                state["messages"].append(
-                    AIMessage(content=f"❌ Failed to convert Dockerfile: {str(e)}")
-                )
-                return state
+            # Simple Dockerfiles are converted by rules; the LLM handles the rest
+            # and every retry with validation error context
+            updated_dockerfile_content = None
+            if not validation_error:
+                updated_dockerfile_content = try_mechanical_multi_stage(dockerfile_content, build_platform, build_as_config)
+                if updated_dockerfile_content is not None:
+                    msgs.append("⚙️ Dockerfile matches the simple python-pypi layout. Converted without the LLM.")
+            
+            if updated_dockerfile_content is None:
+                try:
+                    # Imported here so that loading the graph doesn't pull in the LLM clients
+                    from agent.tools.llm_tools import convert_dockerfile_to_multi_stage
+                    
+                    # The LLM client call is blocking, keep it off the event loop
+                    updated_dockerfile_content = await asyncio.to_thread(
+                        convert_dockerfile_to_multi_stage,
+                        dockerfile_content,
+                        build_platform,
+                        build_as_config,
+                        validation_error
+                    )
+                except Exception as e:
+                    state["dockerfile_updated"] = False
+                    state["dockerfile_validation_passed"] = False
+                    state["error"] = f"Failed to convert Dockerfile using LLM: {str(e)}"
+                    msgs.append(f"❌ Failed to convert Dockerfile: {str(e)}")
+                    return append_messages(state, msgs)
             
             # Step 4: Write the updated Dockerfile as Dockerfile-argo
             try:
                 if retry_count > 0 and validation_error:
                     # Retry: write directly to the existing -argo file
-                    full_dockerfile_path.write_text(updated_dockerfile_content, encoding='utf-8')
-                    relative_argo_path = Path(full_dockerfile_path).relative_to(clone_path)
+                    write_text_atomic(full_dockerfile_path, updated_dockerfile_content)
+                    relative_argo_path = full_dockerfile_path.relative_to(clone_path_obj)
                     state["dockerfile_argo_path"] = str(relative_argo_path)
-                    state["messages"].append(
-                        AIMessage(content=f"✅ Successfully updated multi-stage Dockerfile at {relative_argo_path}")
-                    )
+                    msgs.append(f"✅ Successfully updated multi-stage Dockerfile at {relative_argo_path}")
                 else:
                     # First attempt: create new -argo file from original Dockerfile
-                    dockerfile_argo_path = write_dockerfile_argo(str(full_dockerfile_path), updated_dockerfile_content)
-                    relative_argo_path = Path(dockerfile_argo_path).relative_to(clone_path)
+                    dockerfile_argo_path = write_dockerfile_argo(full_dockerfile_path, updated_dockerfile_content)
+                    relative_argo_path = Path(dockerfile_argo_path).relative_to(clone_path_obj)
                     state["dockerfile_argo_path"] = str(relative_argo_path)
-                    state["messages"].append(
-                        AIMessage(content=f"✅ Successfully created multi-stage Dockerfile at {relative_argo_path}")
-                    )
+                    msgs.append(f"✅ Successfully created multi-stage Dockerfile at {relative_argo_path}")
                 
                 state["dockerfile_updated"] = True
+                dockerfile_content = updated_dockerfile_content
             except Exception as e:
                 state["dockerfile_updated"] = False
                 state["dockerfile_validation_passed"] = False
                 state["error"] = f"Failed to write Dockerfile-argo: {str(e)}"
-                state["messages"].append(
-                    AIMessage(content=f"❌ Failed to write Dockerfile-argo: {str(e)}")
-                )
-                return state
+                msgs.append(f"❌ Failed to write Dockerfile-argo: {str(e)}")
+                return append_messages(state, msgs)
         
         # Step 5: Validate the Dockerfile
         dockerfile_argo_path = state.get("dockerfile_argo_path")
         if not dockerfile_argo_path:
             state["dockerfile_validation_passed"] = False
             state["dockerfile_validation_error"] = "No Dockerfile-argo path found for validation"
-            state["messages"].append(
-                AIMessage(content="❌ Cannot validate Dockerfile: No Dockerfile-argo found")
-            )
-            return state
+            msgs.append("❌ Cannot validate Dockerfile: No Dockerfile-argo found")
+            return append_messages(state, msgs)
         
-        # Determine the docker-argo-bake.hcl file path
-        if docker_bake_file_path:
-            bake_file_path = Path(clone_path) / docker_bake_file_path
-        else:
-            # Default to docker-argo-bake.hcl in the same directory as the dockerfile
-            dockerfile_path_obj = Path(clone_path) / dockerfile_argo_path
-            bake_file_path = dockerfile_path_obj.parent / "docker-argo-bake.hcl"
+        # Determine the docker-argo-bake.hcl file path and check that it exists
+        # (unchanged across retries unless the -argo path does)
+        if bake_location is None or bake_location[0] != dockerfile_argo_path:
+            if docker_bake_file_path:
+                bake_file_path = clone_path_obj / docker_bake_file_path
+            else:
+                # Default to docker-argo-bake.hcl in the same directory as the dockerfile
+                bake_file_path = (clone_path_obj / dockerfile_argo_path).parent / "docker-argo-bake.hcl"
+            bake_location = (dockerfile_argo_path, bake_file_path, bake_file_path.exists())
+        _, bake_file_path, bake_file_exists = bake_location
         
         # Check if bake file exists
-        if not bake_file_path.exists():
+        if not bake_file_exists:
+            relative_bake_path = bake_file_path.relative_to(clone_path_obj)
             state["dockerfile_validation_passed"] = False
-            state["dockerfile_validation_error"] = f"Docker bake file not found at {bake_file_path.relative_to(clone_path)}"
-            state["messages"].append(
-                AIMessage(content=f"❌ Docker bake file not found at {bake_file_path.relative_to(clone_path)}")
-            )
-            return state
+            state["dockerfile_validation_error"] = f"Docker bake file not found at {relative_bake_path}"
+            msgs.append(f"❌ Docker bake file not found at {relative_bake_path}")
+            return append_messages(state, msgs)
         
         # Get the directory where the bake file is located (for running the command)
         bake_file_dir = bake_file_path.parent
         bake_file_name = bake_file_path.name
         
-        state["messages"].append(
-            AIMessage(content=f"🔍 Validating Dockerfile using docker buildx bake -f {bake_file_name}...")
-        )
+        # Skip the build if this exact Dockerfile has already failed validation
+        content_hash = hashlib.sha256(dockerfile_content.encode("utf-8")).hexdigest()
+        previous_error = failed_builds.get(content_hash)
+        if previous_error is not None:
+            attempt = retry_count + 1
+            state["dockerfile_validation_retry_count"] = attempt
+            state["dockerfile_validation_error"] = previous_error
+            # Ask for a different fix instead of the same one again
+            validation_error = (
+                previous_error
+                + "\n\nThe previous fix produced exactly the same Dockerfile, which already failed with the error above. "
+                "Take a different approach to fix it."
+            )
+            
+            if attempt > max_retries:
+                state["dockerfile_validation_passed"] = False
+                msgs.append(f"🔁 LLM produced identical Dockerfile (attempt {attempt}/{max_retries + 1}); skipping redundant build. Maximum retries reached. Error:\n{previous_error}")
+                return append_messages(state, msgs)
+            else:
+                msgs.append(f"🔁 LLM produced identical Dockerfile (attempt {attempt}/{max_retries + 1}); skipping redundant build. Retrying...")
+                continue
+        
+        msgs.append(f"🔍 Validating Dockerfile using docker buildx bake -f {bake_file_name}...")
         
         # Run docker buildx bake validation
         try:
-            # Change to the directory containing the bake file and run the command
-            result = subprocess.run(
-                ["docker", "buildx", "bake", "-f", bake_file_name, "--set", "app.platform=linux/amd64"],
-                cwd=str(bake_file_dir),
-                capture_output=True,
-                text=True,
+            # Run the command in the directory containing the bake file, on the shared builder
+            result = await run_cached_buildx_bake(
+                bake_file_name,
+                str(bake_file_dir),
+                buildx_cache_dir,
                 timeout=300  # 5 minute timeout
             )
             
@@ -258,87 +334,60 @@ def create_and_validate_dockerfile_node(state: AgentState) -> AgentState:
                 state["dockerfile_validation_passed"] = True
                 state["dockerfile_validation_error"] = None
                 state["dockerfile_validation_retry_count"] = retry_count
-                state["messages"].append(
-                    AIMessage(content="✅ Dockerfile validation passed! The Dockerfile is valid.")
-                )
-                return state
+                msgs.append("✅ Dockerfile validation passed! The Dockerfile is valid.")
+                return append_messages(state, msgs)
             else:
                 # Validation failed - prepare for retry
                 validation_error = result.stderr if result.stderr else result.stdout
-                retry_count += 1
-                state["dockerfile_validation_retry_count"] = retry_count
+                if _is_content_error(validation_error):
+                    failed_builds[content_hash] = validation_error
+                attempt = retry_count + 1
+                state["dockerfile_validation_retry_count"] = attempt
                 state["dockerfile_validation_error"] = validation_error
                 
-                if retry_count > max_retries:
+                if attempt > max_retries:
                     # Max retries reached
                     state["dockerfile_validation_passed"] = False
-                    state["messages"].append(
-                        AIMessage(content=f"❌ Dockerfile validation failed (attempt {retry_count}/{max_retries + 1}). Maximum retries reached. Error:\n{validation_error}")
-                    )
-                    return state
+                    msgs.append(f"❌ Dockerfile validation failed (attempt {attempt}/{max_retries + 1}). Maximum retries reached. Error:\n{validation_error}")
+                    return append_messages(state, msgs)
                 else:
                     # Will retry
-                    state["messages"].append(
-                        AIMessage(content=f"❌ Dockerfile validation failed (attempt {retry_count}/{max_retries + 1}). Retrying with error context:\n{validation_error}")
-                    )
-                    # Continue loop to retry
-                    continue
+                    msgs.append(f"❌ Dockerfile validation failed (attempt {attempt}/{max_retries + 1}). Retrying with error context:\n{validation_error}")
                 
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
+            # Building the same Dockerfile again would just hit the timeout again,
+            # and the build log says nothing the LLM could fix, so don't retry
             validation_error = "Dockerfile validation timed out after 5 minutes"
-            retry_count += 1
-            state["dockerfile_validation_retry_count"] = retry_count
+            state["dockerfile_validation_retry_count"] = max_retries + 1
             state["dockerfile_validation_error"] = validation_error
-            
-            if retry_count > max_retries:
-                state["dockerfile_validation_passed"] = False
-                state["messages"].append(
-                    AIMessage(content=f"❌ Dockerfile validation timed out (attempt {retry_count}/{max_retries + 1}). Maximum retries reached.")
-                )
-                return state
-            else:
-                state["messages"].append(
-                    AIMessage(content=f"❌ Dockerfile validation timed out (attempt {retry_count}/{max_retries + 1}). Retrying...")
-                )
-                continue
+            state["dockerfile_validation_passed"] = False
+            msgs.append(f"❌ Dockerfile validation timed out (attempt {retry_count + 1}/{max_retries + 1}). Not retrying.")
+            return append_messages(state, msgs)
                 
         except FileNotFoundError:
+            # A missing docker binary fails every attempt the same way, so don't
+            # spend more LLM conversions retrying
             validation_error = "Docker buildx not found. Please ensure Docker is installed and buildx is available."
-            retry_count += 1
-            state["dockerfile_validation_retry_count"] = retry_count
+            state["dockerfile_validation_retry_count"] = max_retries + 1
             state["dockerfile_validation_error"] = validation_error
-            
-            if retry_count > max_retries:
-                state["dockerfile_validation_passed"] = False
-                state["messages"].append(
-                    AIMessage(content=f"❌ Docker buildx not found (attempt {retry_count}/{max_retries + 1}). Maximum retries reached. Please ensure Docker is installed.")
-                )
-                return state
-            else:
-                state["messages"].append(
-                    AIMessage(content=f"❌ Docker buildx not found (attempt {retry_count}/{max_retries + 1}). Retrying...")
-                )
-                continue
+            state["dockerfile_validation_passed"] = False
+            msgs.append(f"❌ Docker buildx not found (attempt {retry_count + 1}/{max_retries + 1}). Not retrying. Please ensure Docker is installed.")
+            return append_messages(state, msgs)
                 
         except Exception as e:
             validation_error = f"Unexpected error during validation: {str(e)}"
-            retry_count += 1
-            state["dockerfile_validation_retry_count"] = retry_count
+            attempt = retry_count + 1
+            state["dockerfile_validation_retry_count"] = attempt
             state["dockerfile_validation_error"] = validation_error
             
-            if retry_count > max_retries:
+            if attempt > max_retries:
                 state["dockerfile_validation_passed"] = False
-                state["messages"].append(
-                    AIMessage(content=f"❌ Unexpected error during validation (attempt {retry_count}/{max_retries + 1}). Maximum retries reached: {str(e)}")
-                )
-                return state
+                msgs.append(f"❌ Unexpected error during validation (attempt {attempt}/{max_retries + 1}). Maximum retries reached: {str(e)}")
+                return append_messages(state, msgs)
             else:
-                state["messages"].append(
-                    AIMessage(content=f"❌ Unexpected error during validation (attempt {retry_count}/{max_retries + 1}). Retrying: {str(e)}")
-                )
-                continue
+                msgs.append(f"❌ Unexpected error during validation (attempt {attempt}/{max_retries + 1}). Retrying: {str(e)}")
     
-    # Should not reach here, but handle edge case
+    # Only reached if the retries were already used up before this node ran
     state["dockerfile_validation_passed"] = False
-    return state
+    return append_messages(state, msgs)
 
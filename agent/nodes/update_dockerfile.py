@@ -6,9 +6,11 @@ from agent.state import AgentState
 from agent.tools.docker_tools import (
     read_dockerfile,
     is_multi_stage_dockerfile,
-    write_dockerfile_argo
+    get_dockerfile_argo_path,
+    try_mechanical_multi_stage,
+    write_dockerfile_argo,
+    write_text_atomic
 )
-from agent.tools.llm_tools import convert_dockerfile_to_multi_stage
 
 
 def update_dockerfile_node(state: AgentState) -> AgentState:
@@ -92,7 +94,7 @@ def update_dockerfile_node(state: AgentState) -> AgentState:
     
     # Read the Dockerfile
     try:
-        dockerfile_content = read_dockerfile(str(full_dockerfile_path))
+        dockerfile_content = read_dockerfile(full_dockerfile_path)
         if dockerfile_content is None:
             state["dockerfile_updated"] = False
             state["error"] = f"Dockerfile not found at {full_dockerfile_path}"
@@ -113,17 +115,7 @@ def update_dockerfile_node(state: AgentState) -> AgentState:
     validation_error = state.get("dockerfile_validation_error")
     if is_multi_stage_dockerfile(dockerfile_content) and not validation_error:
         # If already multi-stage and no validation error, construct the -argo path for consistency
-        dockerfile_path_obj = Path(dockerfile_path)
-        if dockerfile_path_obj.suffix:
-            dockerfile_argo_name = dockerfile_path_obj.stem + "-argo" + dockerfile_path_obj.suffix
-        else:
-            dockerfile_argo_name = dockerfile_path_obj.name + "-argo"
-        
-        # Build the path: if parent is ".", just use the name, otherwise use parent/name
-        if dockerfile_path_obj.parent == Path("."):
-            dockerfile_argo_path_str = dockerfile_argo_name
-        else:
-            dockerfile_argo_path_str = str(dockerfile_path_obj.parent / dockerfile_argo_name)
+        dockerfile_argo_path_str = get_dockerfile_argo_path(dockerfile_path)
         
         state["dockerfile_updated"] = True
         state["dockerfile_argo_path"] = dockerfile_argo_path_str
@@ -141,20 +133,34 @@ def update_dockerfile_node(state: AgentState) -> AgentState:
             AIMessage(content=f"🔄 Converting Dockerfile to multi-stage format using build platform: {build_platform}...")
         )
     
-    try:
-        updated_dockerfile_content = convert_dockerfile_to_multi_stage(
-            dockerfile_content,
-            build_platform,
-            build_as_config,
-            validation_error
-        )
-    except Exception as e:
-        state["dockerfile_updated"] = False
-        state["error"] = f"Failed to convert Dockerfile using LLM: {str(e)}"
-        state["messages"].append(
-            AIMessage(content=f"❌ Failed to convert Dockerfile: {str(e)}")
-        )
-        return state
+    # Simple Dockerfiles are converted by rules; the LLM handles the rest
+    # and every retry with validation error context
+    updated_dockerfile_content = None
+    if not validation_error:
+        updated_dockerfile_content = try_mechanical_multi_stage(dockerfile_content, build_platform, build_as_config)
+        if updated_dockerfile_content is not None:
+            state["messages"].append(
+                AIMessage(content="⚙️ Dockerfile matches the simple python-pypi layout. Converted without the LLM.")
+            )
+    
+    if updated_dockerfile_content is None:
+        try:
+            # Imported here so that loading the graph doesn't pull in the LLM clients
+            from agent.tools.llm_tools import convert_dockerfile_to_multi_stage
+            
+            updated_dockerfile_content = convert_dockerfile_to_multi_stage(
+                dockerfile_content,
+                build_platform,
+                build_as_config,
+                validation_error
+            )
+        except Exception as e:
+            state["dockerfile_updated"] = False
+            state["error"] = f"Failed to convert Dockerfile using LLM: {str(e)}"
+            state["messages"].append(
+                AIMessage(content=f"❌ Failed to convert Dockerfile: {str(e)}")
+            )
+            return state
     
     # Write the updated Dockerfile as Dockerfile-argo
     try:
@@ -163,7 +169,7 @@ def update_dockerfile_node(state: AgentState) -> AgentState:
         if validation_error and retry_count > 0:
             # Retry: write directly to the existing -argo file
             # full_dockerfile_path already points to the -argo file when retrying
-            full_dockerfile_path.write_text(updated_dockerfile_content, encoding='utf-8')
+            write_text_atomic(full_dockerfile_path, updated_dockerfile_content)
             relative_argo_path = Path(full_dockerfile_path).relative_to(clone_path)
             state["dockerfile_argo_path"] = str(relative_argo_path)
             state["messages"].append(
@@ -171,7 +177,7 @@ def update_dockerfile_node(state: AgentState) -> AgentState:
             )
         else:
             # First attempt: create new -argo file from original Dockerfile
-            dockerfile_argo_path = write_dockerfile_argo(str(full_dockerfile_path), updated_dockerfile_content)
+            dockerfile_argo_path = write_dockerfile_argo(full_dockerfile_path, updated_dockerfile_content)
             relative_argo_path = Path(dockerfile_argo_path).relative_to(clone_path)
             state["dockerfile_argo_path"] = str(relative_argo_path)
             state["messages"].append(
@@ -2,7 +2,7 @@
 
 from typing import Annotated, TypedDict
 from langgraph.graph.message import add_messages
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import AIMessage, BaseMessage
 
 
 class AgentState(TypedDict):
@@ -12,6 +12,8 @@ class AgentState(TypedDict):
         messages: List of messages in the conversation
         repository_url: The URL of the repository to clone
         clone_path: The local path where the repository will be cloned
+        need_full_history: Whether to clone the full git history instead of a shallow clone
+        analyze_only: Whether to only analyze the repository, using a treeless clone with no working tree
         status: Current status of the operation (pending, cloning, success, error)
         error: Error message if operation failed
         via_cbs_file_content: Content of the ViaCBSfile
@@ -31,6 +33,8 @@ class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
     repository_url: str
     clone_path: str | None
+    need_full_history: bool | None
+    analyze_only: bool | None
     status: str
     error: str | None
     via_cbs_file_content: str | None
@@ -47,6 +51,24 @@ class AgentState(TypedDict):
     dockerfile_validation_error: str | None
     dockerfile_validation_passed: bool | None
 
+
+def append_messages(state: AgentState, lines: list[str]) -> AgentState:
+    """Append buffered progress lines to the state as a single AIMessage.
+    
+    Nodes collect their progress lines locally and emit them once on return,
+    so each node run adds one message to the state instead of one per step.
+    
+    Args:
+        state: Current agent state
+        lines: Progress lines collected by the node
+        
+    Returns:
+        The same state, for use in return statements
+    """
+    if lines:
+        state["messages"].append(AIMessage(content="\n".join(lines)))
+    return state
+
 # class MigrationState(TypedDict):
 #     messages: Annotated[list, add_messages]
 #     repo_url: str
@@ -1,7 +1,10 @@
-from .git_tools import clone_repository
+import importlib
+
+from .git_tools import clone_repository, checkout_paths
 from .validation_tools import validate_repository_url
 from .analysis_tools import (
     find_via_cbs_file,
+    scan_root,
     read_via_cbs_file,
     parse_via_cbs_file,
     parse_docker_bake_file,
@@ -10,11 +13,15 @@ from .analysis_tools import (
 from .docker_tools import (
     read_dockerfile,
     is_multi_stage_dockerfile,
-    write_dockerfile_argo
-)
-from .llm_tools import (
-    get_gemini_model,
-    convert_dockerfile_to_multi_stage
+    get_dockerfile_argo_path,
+    try_mechanical_multi_stage,
+    write_dockerfile_argo,
+    write_text_atomic,
+    start_buildx_builder_warmup,
+    ensure_buildx_builder,
+    run_buildx_bake,
+    get_buildx_cache_dir,
+    run_cached_buildx_bake
 )
 # from .file_tools import parse_via_cbsfile, read_dockerfile, convert_dockerfile_to_multi_stage
 # from .workflow_tools import write_github_workflows, write_docker_argo_bake, get_context_info
@@ -22,15 +29,25 @@ from .llm_tools import (
 
 __all__ = [
     "clone_repository",
+    "checkout_paths",
     "validate_repository_url",
     "find_via_cbs_file",
+    "scan_root",
     "read_via_cbs_file",
     "parse_via_cbs_file",
     "parse_docker_bake_file",
     "find_dockerfile_in_root",
     "read_dockerfile",
     "is_multi_stage_dockerfile",
+    "get_dockerfile_argo_path",
+    "try_mechanical_multi_stage",
     "write_dockerfile_argo",
+    "write_text_atomic",
+    "start_buildx_builder_warmup",
+    "ensure_buildx_builder",
+    "run_buildx_bake",
+    "get_buildx_cache_dir",
+    "run_cached_buildx_bake",
     "get_gemini_model",
     "convert_dockerfile_to_multi_stage"
     # "parse_via_cbsfile",
@@ -39,3 +56,18 @@ __all__ = [
     # "get_context_info",
 ]
 
+
+# llm_tools pulls in the LLM client libraries, so it is only imported on first use
+_LAZY_ATTRIBUTES = {
+    "get_gemini_model": "llm_tools",
+    "convert_dockerfile_to_multi_stage": "llm_tools"
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
@@ -1,9 +1,28 @@
 """Tools for analyzing repository files like ViaCBSfile and docker-bake.hcl."""
 
+import os
 import re
+import stat
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+# Dockerfile names recognized in the repository root, in order of preference
+DOCKERFILE_NAMES = ("Dockerfile", "Containerfile")
+_DOCKERFILE_NAME_SET = frozenset(DOCKERFILE_NAMES)
+
+# Matches a single opening or closing brace, used to find the end of a block
+_BRACE_PATTERN = re.compile(r'[{}]')
+
+# dockerBakeFile './docker-bake.hcl' (group 1) or the opening of a
+# buildAs('python-pypi') { block (group 2), found in a single scan
+_VIA_CBS_PATTERN = re.compile(
+    r'dockerBakeFile\s+["\']([^"\']+)["\']|buildAs\s*\(\s*["\']([^"\']+)["\']\s*\)\s*\{',
+    re.IGNORECASE
+)
+
+# dockerfile = "path" or dockerfile = 'path' in a docker-bake.hcl target
+_BAKE_DOCKERFILE_PATTERN = re.compile(r'dockerfile\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
 
 def find_via_cbs_file(repo_path: str) -> Optional[Path]:
     """Find the ViaCBSfile in the repository.
@@ -23,12 +42,49 @@ def find_via_cbs_file(repo_path: str) -> Optional[Path]:
     
     for name in possible_names:
         file_path = repo_dir / name
-        if file_path.exists() and file_path.is_file():
-            return file_path
+        # One stat per candidate instead of exists() followed by is_file()
+        try:
+            if stat.S_ISREG(os.stat(file_path).st_mode):
+                return file_path
+        except OSError:
+            pass
     
     return None
 
 
+def scan_root(repo_path: str) -> Dict[str, Optional[Path]]:
+    """Find the ViaCBSfile and Dockerfile in the repository root in a single pass.
+    
+    Only the top-level directory entries are listed; subdirectories such as
+    .git or node_modules are never descended into. A Dockerfile is preferred
+    over a Containerfile when both exist.
+    
+    Args:
+        repo_path: Path to the cloned repository
+        
+    Returns:
+        Dictionary with 'via_cbs' and 'dockerfile' keys, each the Path to the
+        file if found, None otherwise
+    """
+    via_cbs = None
+    dockerfiles = {}
+    
+    with os.scandir(repo_path) as it:
+        for entry in it:
+            name = entry.name
+            if name == "ViaCBSfile":
+                if entry.is_file():
+                    via_cbs = Path(entry.path)
+            elif name in _DOCKERFILE_NAME_SET and entry.is_file():
+                dockerfiles[name] = Path(entry.path)
+            # Stop as soon as the preferred names have both been seen
+            if via_cbs and DOCKERFILE_NAMES[0] in dockerfiles:
+                break
+    
+    dockerfile = next((dockerfiles[name] for name in DOCKERFILE_NAMES if name in dockerfiles), None)
+    return {"via_cbs": via_cbs, "dockerfile": dockerfile}
+
+
 def read_via_cbs_file(file_path: Path) -> str:
     """Read the content of a ViaCBSfile.
     
@@ -55,8 +111,7 @@ def parse_docker_bake_file(file_path: Path) -> Optional[str]:
         
         # Look for dockerfile = "..." pattern
         # This regex matches dockerfile = "path" or dockerfile = 'path'
-        pattern = r'dockerfile\s*=\s*["\']([^"\']+)["\']'
-        match = re.search(pattern, content, re.IGNORECASE)
+        match = _BAKE_DOCKERFILE_PATTERN.search(content)
         
         if match:
             return match.group(1)
@@ -90,38 +145,41 @@ def parse_via_cbs_file(content: str) -> Dict[str, Any]:
     docker_keywords = ['docker', 'Docker', 'DOCKER']
     result["has_docker_spec"] = any(keyword in content for keyword in docker_keywords)
     
-    # Extract dockerBakeFile value
-    # Pattern: dockerBakeFile './docker-bake.hcl' or dockerBakeFile "./docker-bake.hcl"
-    docker_bake_pattern = r'dockerBakeFile\s+["\']([^"\']+)["\']'
-    docker_bake_match = re.search(docker_bake_pattern, content, re.IGNORECASE)
-    if docker_bake_match:
-        result["docker_bake_file"] = docker_bake_match.group(1)
+    # Find the first dockerBakeFile value and the first buildAs block in one pass
+    # Patterns: dockerBakeFile './docker-bake.hcl' or dockerBakeFile "./docker-bake.hcl",
+    # buildAs('java-gradle') { ... } or buildAs("python-pypi") { ... }
+    build_as_match = None
+    for match in _VIA_CBS_PATTERN.finditer(content):
+        if match.group(1) is not None:
+            if result["docker_bake_file"] is None:
+                result["docker_bake_file"] = match.group(1)
+        elif build_as_match is None:
+            build_as_match = match
+        if result["docker_bake_file"] is not None and build_as_match is not None:
+            break
     
     # Extract buildAs block content
-    # Pattern: buildAs('java-gradle') { ... } or buildAs("python-pypi") { ... }
-    build_as_pattern = r'buildAs\s*\(\s*["\']([^"\']+)["\']\s*\)\s*\{'
-    build_as_match = re.search(build_as_pattern, content, re.IGNORECASE | re.DOTALL)
     if build_as_match:
-        platform_name = build_as_match.group(1)
+        platform_name = build_as_match.group(2)
         result["build_platform"] = platform_name
         
         # Find the start of the block content (after the opening brace)
         block_start = build_as_match.end()
         
-        # Find the matching closing brace by counting braces
+        # Find the matching closing brace by counting braces. The regex scan
+        # jumps straight from one brace to the next instead of visiting
+        # every character in Python.
         brace_count = 1
-        i = block_start
         block_end = None
         
-        while i < len(content) and brace_count > 0:
-            if content[i] == '{':
+        for brace in _BRACE_PATTERN.finditer(content, block_start):
+            if brace.group() == '{':
                 brace_count += 1
-            elif content[i] == '}':
+            else:
                 brace_count -= 1
                 if brace_count == 0:
-                    block_end = i
+                    block_end = brace.start()
                     break
-            i += 1
         
         # Extract the block content (everything between the braces)
         if block_end is not None and block_end > block_start:
@@ -132,7 +190,7 @@ def parse_via_cbs_file(content: str) -> Dict[str, Any]:
 
 
 def find_dockerfile_in_root(repo_path: str) -> Optional[Path]:
-    """Check if Dockerfile exists in the root of the repository.
+    """Check if a Dockerfile (or Containerfile) exists in the root of the repository.
     
     Args:
         repo_path: Path to the cloned repository
@@ -140,11 +198,7 @@ def find_dockerfile_in_root(repo_path: str) -> Optional[Path]:
     Returns:
         Path to Dockerfile if found, None otherwise
     """
-    repo_dir = Path(repo_path)
-    dockerfile_path = repo_dir / "Dockerfile"
-    
-    if dockerfile_path.exists() and dockerfile_path.is_file():
-        return dockerfile_path
-    
-    return None
-
+    try:
+        return scan_root(repo_path)["dockerfile"]
+    except OSError:
+        return None
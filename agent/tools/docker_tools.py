@@ -1,10 +1,56 @@
 """Tools for working with Dockerfiles."""
 
+import asyncio
+import os
+import re
+import signal
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
+# Named buildx builder reused by every validation in this process
+BUILDX_BUILDER_NAME = "migration-agent-builder"
 
-def read_dockerfile(dockerfile_path: str) -> Optional[str]:
+# Whether the builder has been set up; only success is remembered, so a
+# failed setup (e.g. the daemon still starting) is retried by the next validation
+_buildx_builder_ready = False
+
+# Background bootstrap started by start_buildx_builder_warmup, if any
+_warmup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="buildx-warmup")
+_buildx_builder_warmup: Optional[Future] = None
+
+# A FROM instruction at the start of a line (after optional indentation);
+# comment lines never match since they start with '#'
+_FROM_PATTERN = re.compile(r'^[^\S\n]*FROM', re.MULTILINE | re.IGNORECASE)
+
+# Patterns for the rule-based python-pypi conversion in try_mechanical_multi_stage
+_PYTHON_VERSION_PATTERN = re.compile(r"""pythonVersion\s+['"](([0-9]+\.[0-9]+)(?:\.[0-9]+)*)['"]""")
+# Only Debian-based tags match; -alpine, -windows* and other variants are left to the LLM
+_PYTHON_IMAGE_PATTERN = re.compile(
+    r'^(?:docker\.io/)?(?:library/)?python:([0-9]+\.[0-9]+)(?:\.[0-9]+)?'
+    r'(?:-slim)?(?:-(?:jessie|stretch|buster|bullseye|bookworm|trixie))?$'
+)
+_PIP_INSTALL_PATTERN = re.compile(r'^(?:python[0-9.]*\s+-m\s+)?pip[0-9.]*\s+install\s+[^&|;`$<>\\]+$')
+_PIP_UNSUPPORTED_OPTIONS = frozenset(("-e", "--editable", "--user", "-t", "--target", "--prefix", "--root"))
+_MECHANICAL_INSTRUCTIONS = frozenset(
+    ("FROM", "ARG", "ENV", "WORKDIR", "COPY", "ADD", "RUN", "EXPOSE", "LABEL", "USER", "CMD", "ENTRYPOINT")
+)
+_VENV_PATH = "/opt/venv"
+
+# How much of the end of the bake output is kept for error reporting
+BUILD_OUTPUT_TAIL_BYTES = 64 * 1024
+BUILD_OUTPUT_TAIL_LINES = 200
+
+# Final line buildx prints when a build fails, e.g. "ERROR: failed to solve: ..."
+# or, from bake, 'ERROR: target "app": failed to solve: ...'; nothing after it
+# is worth waiting for
+_BUILD_FAILED_PATTERN = re.compile(rb'^ERROR:[^\n]*failed to solve', re.MULTILINE)
+
+
+def read_dockerfile(dockerfile_path: Union[str, os.PathLike]) -> Optional[str]:
     """Read the content of a Dockerfile.
     
     Args:
@@ -13,13 +59,11 @@ def read_dockerfile(dockerfile_path: str) -> Optional[str]:
     Returns:
         Content of the Dockerfile as a string, or None if file doesn't exist
     """
-    dockerfile = Path(dockerfile_path)
-    
-    if not dockerfile.exists():
-        return None
-    
+    # Open directly instead of checking exists() first, so a read is one open()
     try:
-        return dockerfile.read_text(encoding='utf-8')
+        return Path(dockerfile_path).read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return None
     except Exception as e:
         raise Exception(f"Failed to read Dockerfile: {str(e)}")
 
@@ -33,42 +77,411 @@ def is_multi_stage_dockerfile(dockerfile_content: str) -> bool:
     Returns:
         True if Dockerfile has multiple FROM statements (multi-stage), False otherwise
     """
-    # Count FROM statements (case-insensitive, ignoring comments)
-    lines = dockerfile_content.split('\n')
-    from_count = 0
+    # Count FROM statements (case-insensitive, ignoring comments), stopping at the second one
+    return sum(1 for _ in islice(_FROM_PATTERN.finditer(dockerfile_content), 2)) > 1
+
+
+def try_mechanical_multi_stage(
+    dockerfile_content: str,
+    build_platform: str,
+    build_as_config: Optional[str] = None
+) -> Optional[str]:
+    """Convert a simple single-stage python-pypi Dockerfile without the LLM.
+    
+    Handles Dockerfiles with a single Debian-based `FROM python:<tag>`
+    (matching the pythonVersion from the buildAs block) where every RUN before the last
+    `pip install` is itself a plain `pip install`. The pip installs move to a
+    build stage on the same base image that installs into a virtualenv, so
+    compiled wheels link against the libraries of the image they run on. The
+    runtime stage copies the virtualenv and keeps every other instruction
+    unchanged, apart from copies that a later `COPY . .` repeats.
     
-    for line in lines:
-        # Strip whitespace and check if line starts with FROM (ignoring comments)
+    Args:
+        dockerfile_content: Content of the existing single-stage Dockerfile
+        build_platform: Build platform from CICD (e.g., 'python-pypi')
+        build_as_config: Full content inside the buildAs block (e.g., "pythonVersion '3.7.9'")
+        
+    Returns:
+        Multi-stage Dockerfile content, or None if the Dockerfile is not simple
+        enough and the LLM should convert it
+    """
+    if build_platform != "python-pypi" or not build_as_config:
+        return None
+    version_match = _PYTHON_VERSION_PATTERN.search(build_as_config)
+    if not version_match:
+        return None
+    python_minor_version = version_match.group(2)
+    
+    # Split into (instruction, arguments, original line); comments and blank lines have no instruction
+    parsed = []
+    for line in dockerfile_content.split("\n"):
         stripped = line.strip()
-        if stripped and not stripped.startswith('#'):
-            if stripped.upper().startswith('FROM'):
-                from_count += 1
+        if not stripped or stripped.startswith("#"):
+            parsed.append((None, "", line))
+            continue
+        if stripped.endswith("\\") or "<<" in stripped:
+            return None  # line continuations and heredocs are left to the LLM
+        instruction, _, arguments = stripped.partition(" ")
+        instruction = instruction.upper()
+        if instruction not in _MECHANICAL_INSTRUCTIONS:
+            return None
+        parsed.append((instruction, arguments.strip(), line))
+    
+    instructions = [entry for entry in parsed if entry[0]]
+    if not instructions or instructions[0][0] != "FROM":
+        return None
+    if sum(1 for instruction, _, _ in instructions if instruction == "FROM") != 1:
+        return None
+    image_match = _PYTHON_IMAGE_PATTERN.match(instructions[0][1])
+    if not image_match or image_match.group(1) != python_minor_version:
+        return None
+    
+    pip_indexes = [
+        index for index, (instruction, arguments, _) in enumerate(parsed)
+        if instruction == "RUN" and _PIP_INSTALL_PATTERN.match(arguments)
+    ]
+    if not pip_indexes:
+        return None
+    last_pip_index = pip_indexes[-1]
+    
+    build_lines = [
+        f"FROM {instructions[0][1]} AS build",
+        f"RUN python -m venv {_VENV_PATH}",
+        f'ENV PATH="{_VENV_PATH}/bin:$PATH"'
+    ]
+    # A later `COPY . .` copies the whole context again, so earlier copies into
+    # the same directory are only needed by the build stage
+    redundant_copy_indexes = set()
+    pending_copy_indexes = []
+    for index, (instruction, arguments, _) in enumerate(parsed):
+        if instruction == "WORKDIR":
+            pending_copy_indexes = []
+        elif instruction == "COPY" and arguments.split() in ([".", "."], [".", "./"]):
+            redundant_copy_indexes.update(pending_copy_indexes)
+        elif instruction == "COPY" and index < last_pip_index and not arguments.startswith("--"):
+            if arguments.split()[-1] in (".", "./"):
+                pending_copy_indexes.append(index)
+    
+    runtime_lines = []
+    for index, (instruction, arguments, line) in enumerate(parsed):
+        if index in pip_indexes:
+            if _PIP_UNSUPPORTED_OPTIONS.intersection(arguments.split()):
+                return None
+            build_lines.append(line.strip())
+            continue
+        if index < last_pip_index:
+            if instruction in ("RUN", "USER") or (instruction == "ENV" and "PATH" in arguments):
+                return None  # the build stage would have to reproduce these
+            if instruction in ("ARG", "ENV", "WORKDIR", "COPY", "ADD"):
+                build_lines.append(line.strip())
+        if index in redundant_copy_indexes:
+            continue
+        runtime_lines.append(line)
+        if instruction == "FROM":
+            runtime_lines.append(f"COPY --from=build {_VENV_PATH} {_VENV_PATH}")
+            runtime_lines.append(f'ENV PATH="{_VENV_PATH}/bin:$PATH"')
     
-    return from_count > 1
+    return "\n".join(build_lines) + "\n\n" + "\n".join(runtime_lines).strip("\n") + "\n"
 
 
-def write_dockerfile_argo(dockerfile_path: str, content: str) -> str:
-    """Write the updated Dockerfile with "-argo" suffix in the same directory.
+def write_text_atomic(path: Path, content: str) -> None:
+    """Write a text file by writing a temporary file next to it and renaming it.
+    
+    Readers see either the old or the new content, never a partially written file.
+    
+    Args:
+        path: Path of the file to write
+        content: Content to write (UTF-8)
+    
+    Newlines are written as-is (no platform translation), so the file bytes
+    always match the content that was hashed or validated.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "w", encoding='utf-8', newline='') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+@lru_cache(maxsize=128)
+def get_dockerfile_argo_path(dockerfile_path: str) -> str:
+    """Get the path of the "-argo" copy of a Dockerfile.
     
     Args:
         dockerfile_path: Path to the original Dockerfile
-        content: Content to write to Dockerfile-argo
         
     Returns:
-        Path to the created Dockerfile-argo file (relative to the same base as input)
+        Path with "-argo" added before the extension, or at the end if there is
+        no extension, in the same directory as dockerfile_path
     """
     original_dockerfile = Path(dockerfile_path)
-    dockerfile_dir = original_dockerfile.parent
-    # Add "-argo" before the extension, or at the end if no extension
     if original_dockerfile.suffix:
         dockerfile_argo_name = original_dockerfile.stem + "-argo" + original_dockerfile.suffix
     else:
         dockerfile_argo_name = original_dockerfile.name + "-argo"
-    dockerfile_argo_path = dockerfile_dir / dockerfile_argo_name
+    return str(original_dockerfile.parent / dockerfile_argo_name)
+
+
+def write_dockerfile_argo(dockerfile_path: Union[str, os.PathLike], content: str) -> str:
+    """Write the updated Dockerfile with "-argo" suffix in the same directory.
+    
+    Args:
+        dockerfile_path: Path to the original Dockerfile
+        content: Content to write to Dockerfile-argo
+        
+    Returns:
+        Path to the created Dockerfile-argo file (relative to the same base as input)
+    """
+    dockerfile_argo_path = Path(get_dockerfile_argo_path(os.fspath(dockerfile_path)))
     
     try:
-        dockerfile_argo_path.write_text(content, encoding='utf-8')
+        write_text_atomic(dockerfile_argo_path, content)
         return str(dockerfile_argo_path)
     except Exception as e:
         raise Exception(f"Failed to write Dockerfile-argo: {str(e)}")
 
+
+
+async def _run_docker_command(*args: str, timeout: float = 300) -> int:
+    """Run a docker CLI command, discarding its output, and return the exit code."""
+    process = await asyncio.create_subprocess_exec(
+        "docker",
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        return await asyncio.wait_for(process.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+
+
+async def _prepare_buildx_builder() -> bool:
+    """Look up or create the shared builder and bootstrap it.
+    
+    Returns:
+        True if the builder is running, False if it could not be started
+    """
+    try:
+        return (
+            await _run_docker_command("buildx", "inspect", "--bootstrap", BUILDX_BUILDER_NAME) == 0
+            or await _run_docker_command(
+                "buildx", "create", "--name", BUILDX_BUILDER_NAME,
+                "--driver", "docker-container", "--bootstrap"
+            ) == 0
+        )
+    except (FileNotFoundError, asyncio.TimeoutError):
+        return False
+
+
+def start_buildx_builder_warmup() -> None:
+    """Start bootstrapping the shared buildx builder in the background.
+    
+    Starting the BuildKit container takes a few seconds, so it is started
+    while the repository is still being cloned and the Dockerfile converted;
+    ensure_buildx_builder then waits for this bootstrap instead of running its own.
+    """
+    global _buildx_builder_warmup
+    
+    if not _buildx_builder_ready and _buildx_builder_warmup is None:
+        _buildx_builder_warmup = _warmup_executor.submit(asyncio.run, _prepare_buildx_builder())
+
+
+async def ensure_buildx_builder() -> Optional[str]:
+    """Make sure the shared buildx builder exists and is running.
+    
+    Once the builder has been looked up (or created) and bootstrapped,
+    later validations in the process skip the BuildKit cold start. A failed
+    setup is not remembered and is tried again by the next validation.
+    It always uses the docker-container driver, which the local layer cache
+    export needs. The user's default builder is left untouched.
+    
+    Returns:
+        Name of the builder to pass to `--builder`, or None to use the default builder
+    """
+    global _buildx_builder_ready, _buildx_builder_warmup
+    
+    if not _buildx_builder_ready:
+        # Concurrent validations share one setup attempt
+        start_buildx_builder_warmup()
+        warmup = _buildx_builder_warmup
+        if await asyncio.wrap_future(warmup):
+            _buildx_builder_ready = True
+        elif _buildx_builder_warmup is warmup:
+            _buildx_builder_warmup = None
+    
+    return BUILDX_BUILDER_NAME if _buildx_builder_ready else None
+
+
+def run_coroutine_sync(coroutine):
+    """Run a coroutine to completion from synchronous code.
+    
+    asyncio.run cannot be called while an event loop is running in the
+    current thread (e.g. in Jupyter or under an async caller), so in that
+    case the coroutine gets its own event loop on a separate thread.
+    
+    Args:
+        coroutine: Coroutine to run
+        
+    Returns:
+        The coroutine's result
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync-runner") as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def _kill_process_group(process: asyncio.subprocess.Process, sig: int) -> None:
+    """Send a signal to a process started with start_new_session=True and its children."""
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+async def run_buildx_bake(
+    bake_file_name: str,
+    cwd: str,
+    timeout: float = 300,
+    builder: Optional[str] = None,
+    cache_dir: Optional[str] = None
+) -> subprocess.CompletedProcess:
+    """Run `docker buildx bake` without blocking the event loop.
+    
+    A failed build is stopped as soon as buildx prints its final error, so
+    its returncode may be negative (terminated by SIGTERM).
+    
+    Args:
+        bake_file_name: Name of the bake file, relative to cwd
+        cwd: Directory to run the command in (the bake file's directory)
+        timeout: Seconds to wait before the build is killed (default: 5 minutes)
+        builder: Name of the buildx builder to use (default: the current builder)
+        cache_dir: Local directory to import and export the BuildKit layer cache
+            (only supported by a docker-container builder)
+        
+    Returns:
+        CompletedProcess with returncode, an empty stdout and, as stderr, the last
+        BUILD_OUTPUT_TAIL_LINES lines of the combined build output
+        
+    Raises:
+        asyncio.TimeoutError: If the build does not finish within timeout
+        FileNotFoundError: If the docker binary is not installed
+    """
+    args = ["docker", "buildx", "bake", "-f", bake_file_name, "--set", "app.platform=linux/amd64"]
+    if builder:
+        args += ["--builder", builder]
+    if cache_dir:
+        args += [
+            "--set", f"*.cache-from=type=local,src={cache_dir}",
+            "--set", f"*.cache-to=type=local,dest={cache_dir},mode=max"
+        ]
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        # docker runs buildx as a child plugin process that shares our pipe;
+        # a separate process group lets a timeout kill both
+        start_new_session=True
+    )
+    
+    # Stream the output and keep only its tail, so verbose builds don't pile
+    # up in memory; only the end of the log is useful as error context
+    tail = bytearray()
+    
+    async def read_output() -> None:
+        stopping = False
+        # Start of the first line not yet checked for the failure line
+        scan_from = 0
+        while chunk := await process.stdout.read(65536):
+            tail.extend(chunk)
+            if not stopping:
+                # Only check complete lines, so the error line is never cut short
+                lines_end = tail.rfind(b"\n") + 1
+                if lines_end > scan_from:
+                    if _BUILD_FAILED_PATTERN.search(tail, scan_from, lines_end):
+                        # The build has failed; don't wait for buildx to shut
+                        # down the build session
+                        stopping = True
+                        _kill_process_group(process, signal.SIGTERM)
+                    scan_from = lines_end
+            trimmed = len(tail) - BUILD_OUTPUT_TAIL_BYTES
+            if trimmed > 0:
+                del tail[:trimmed]
+                scan_from = max(scan_from - trimmed, 0)
+        await process.wait()
+    
+    try:
+        await asyncio.wait_for(read_output(), timeout=timeout)
+    except asyncio.TimeoutError:
+        _kill_process_group(process, signal.SIGKILL)
+        await process.wait()
+        raise
+    
+    output_lines = tail.decode("utf-8", errors="replace").splitlines(keepends=True)
+    if len(tail) == BUILD_OUTPUT_TAIL_BYTES:
+        # The first line was probably cut off
+        output_lines = output_lines[1:]
+    
+    return subprocess.CompletedProcess(
+        args,
+        process.returncode,
+        "",
+        "".join(output_lines[-BUILD_OUTPUT_TAIL_LINES:])
+    )
+
+
+def get_buildx_cache_dir(clone_path: Union[str, os.PathLike]) -> Path:
+    """Get the local BuildKit cache directory for a cloned repository.
+    
+    The cache is kept next to the clone rather than inside it, so it never
+    becomes part of the build context.
+    
+    Args:
+        clone_path: Path to the cloned repository
+        
+    Returns:
+        Absolute path of the cache directory
+    """
+    clone_path_obj = Path(clone_path).resolve()
+    return clone_path_obj.parent / ".cache" / f"{clone_path_obj.name}-buildx"
+
+
+async def run_cached_buildx_bake(
+    bake_file_name: str,
+    cwd: str,
+    cache_dir: Union[str, os.PathLike],
+    timeout: float = 300
+) -> subprocess.CompletedProcess:
+    """Run `docker buildx bake` on the shared builder with a local layer cache.
+    
+    Falls back to the current builder without a cache if the shared builder
+    can't be set up, since the default docker driver can't export a local cache.
+    
+    Args:
+        bake_file_name: Name of the bake file, relative to cwd
+        cwd: Directory to run the command in (the bake file's directory)
+        cache_dir: Local directory to import and export the BuildKit layer cache
+        timeout: Seconds to wait before the build is killed (default: 5 minutes)
+        
+    Returns:
+        CompletedProcess as returned by run_buildx_bake
+    """
+    builder = await ensure_buildx_builder()
+    return await run_buildx_bake(
+        bake_file_name,
+        cwd,
+        timeout=timeout,
+        builder=builder,
+        cache_dir=os.fspath(cache_dir) if builder else None
+    )
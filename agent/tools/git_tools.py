@@ -1,18 +1,324 @@
 """Tools for the repository cloning agent."""
 
+import hashlib
 import os
+import shutil
 import subprocess
+import tempfile
 from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse
 
+try:
+    import fcntl
+except ImportError:
+    # fcntl is not available on Windows; workspaces are always fully copied there
+    fcntl = None
 
-def clone_repository(repository_url: str, target_dir: Optional[str] = "./workspace/") -> dict[str, str]:
+
+# Shallow, single-branch, blobless clone options. Downstream nodes only read
+# the tree at HEAD, so history and tags are never needed.
+SHALLOW_CLONE_OPTIONS = [
+    "--depth=1",
+    "--single-branch",
+    "--filter=blob:none",
+    "--no-tags",
+]
+
+# Treeless, no-checkout clone for analyze-only runs. Trees and blobs are
+# fetched lazily when individual paths are checked out with checkout_paths.
+ANALYZE_ONLY_CLONE_OPTIONS = [
+    "--depth=1",
+    "--single-branch",
+    "--filter=tree:0",
+    "--no-checkout",
+    "--no-tags",
+]
+
+# ioctl request to share a file's data blocks copy-on-write (Linux FICLONE)
+FICLONE = 0x40049409
+
+# Pristine clones are kept under <target_dir>/.cache/clones/ and forked into
+# fresh workspaces. The cache is opt-in: it costs a `git ls-remote` per run and,
+# on filesystems without reflink, a second full copy of every clone
+CACHE_DIR_NAME = ".cache"
+CLONE_CACHE_DIR_NAME = "clones"
+CLONE_CACHE_ENABLED = os.getenv("CLONE_CACHE", "").lower() in ("1", "true", "yes")
+
+# Most cached clones kept; the least recently used ones are removed beyond this
+CLONE_CACHE_MAX_ENTRIES = int(os.getenv("CLONE_CACHE_MAX_ENTRIES", "8"))
+
+
+def _clone_mode(full_history: bool = False, analyze_only: bool = False) -> str:
+    """Name of the clone mode, used to keep workspaces and cached clones of each mode apart."""
+    if analyze_only:
+        return "treeless"
+    if full_history:
+        return "full"
+    return "shallow"
+
+
+def get_clone_path(
+    repository_url: str,
+    target_dir: Optional[str] = "./workspace/",
+    full_history: bool = False,
+    analyze_only: bool = False
+) -> Path:
+    """Compute the local path a repository will be cloned into.
+    
+    The directory name carries a short hash of the URL, so repositories that
+    share a name but live at different URLs never share a workspace.
+    Full-history and analyze-only clones get their own directory, so an
+    existing workspace is only ever reused by a run with the same clone mode.
+    
+    Args:
+        repository_url: The URL of the repository to clone
+        target_dir: Directory the repository is cloned under
+        full_history: Whether the clone has full history
+        analyze_only: Whether the clone is a treeless analyze-only clone
+        
+    Returns:
+        Resolved path of the clone directory
+    """
+    # Extract repository name from URL
+    parsed_url = urlparse(repository_url)
+    repo_name = os.path.basename(parsed_url.path)
+    if repo_name.endswith('.git'):
+        repo_name = repo_name[:-4]
+    if not repo_name:
+        repo_name = "cloned_repo"
+    
+    url_key = hashlib.sha1(repository_url.strip().encode("utf-8")).hexdigest()[:8]
+    repo_name = f"{repo_name}-{url_key}"
+    
+    clone_mode = _clone_mode(full_history, analyze_only)
+    if clone_mode != "shallow":
+        repo_name = f"{repo_name}-{clone_mode}"
+    
+    return Path(target_dir).resolve() / repo_name
+
+
+def get_cache_dir(target_dir: Optional[str] = "./workspace/") -> Path:
+    """Compute the directory cached pristine clones are kept in.
+    
+    Args:
+        target_dir: Directory the repositories are cloned under
+        
+    Returns:
+        Resolved path of the clone cache directory
+    """
+    return Path(target_dir).resolve() / CACHE_DIR_NAME / CLONE_CACHE_DIR_NAME
+
+
+def _cache_entry_prefix(repository_url: str, full_history: bool = False, analyze_only: bool = False) -> str:
+    """Name prefix shared by the cached clones of a repository in one clone mode.
+    
+    The commit the clone was made at is appended to form the entry name.
+    """
+    url_key = hashlib.sha1(repository_url.strip().encode("utf-8")).hexdigest()
+    return f"{url_key}-{_clone_mode(full_history, analyze_only)}-"
+
+
+def _list_cache_entries(cache_dir: Path, prefix: str = "") -> list[Path]:
+    """List complete cache entries, skipping clones still being stored."""
+    if not cache_dir.is_dir():
+        return []
+    return [entry for entry in cache_dir.glob(prefix + "*") if ".tmp-" not in entry.name]
+
+
+def get_remote_head(repository_url: str) -> Optional[str]:
+    """Look up the commit the remote HEAD points to.
+    
+    Args:
+        repository_url: The URL of the repository
+        
+    Returns:
+        Commit SHA of the remote HEAD, or None if the repository has no commits
+        
+    Raises:
+        subprocess.CalledProcessError: If the remote cannot be reached
+        subprocess.TimeoutExpired: If the lookup does not finish in time
+    """
+    result = subprocess.run(
+        ["git", "-c", "protocol.version=2", "ls-remote", repository_url, "HEAD"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        text=True,
+        check=True,
+        timeout=60
+    )
+    fields = result.stdout.split()
+    return fields[0] if fields else None
+
+
+def _reflink_copy(src: str, dst: str, *, follow_symlinks: bool = True) -> str:
+    """Copy a file, sharing its data blocks copy-on-write when the filesystem allows it.
+    
+    Falls back to a regular copy on filesystems without reflink support.
+    Hardlinks are deliberately not used: later nodes rewrite files in place,
+    which would modify the cached clone as well.
+    """
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            shutil.copystat(src, dst, follow_symlinks=follow_symlinks)
+            return dst
+        except OSError:
+            pass
+    return shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
+
+
+def fork_workspace(source_path: Path, workspace_path: Path) -> None:
+    """Copy a clone, such as a cached pristine clone into a workspace, using copy-on-write file copies.
+    
+    Args:
+        source_path: Path of the clone to copy
+        workspace_path: Path of the copy to create
+    """
+    try:
+        shutil.copytree(source_path, workspace_path, symlinks=True, copy_function=_reflink_copy)
+    except Exception:
+        # Do not leave a half-copied workspace that would be mistaken for a complete one
+        shutil.rmtree(workspace_path, ignore_errors=True)
+        raise
+
+
+def _find_cached_clone(
+    repository_url: str,
+    target_dir: Optional[str],
+    full_history: bool,
+    analyze_only: bool
+) -> Optional[Path]:
+    """Find the cached clone of the remote HEAD, if there is one.
+    
+    The remote is only asked for its HEAD when some clone of the repository
+    is cached, so repositories seen for the first time cost no extra round-trip.
+    
+    Args:
+        repository_url: The URL of the repository
+        target_dir: Directory the repository is cloned under
+        full_history: Whether the clone has full history
+        analyze_only: Whether the clone is a treeless analyze-only clone
+        
+    Returns:
+        Path of the cached clone, or None if it has to be cloned
+    """
+    cache_dir = get_cache_dir(target_dir)
+    prefix = _cache_entry_prefix(repository_url, full_history, analyze_only)
+    if not _list_cache_entries(cache_dir, prefix):
+        return None
+    
+    head_sha = get_remote_head(repository_url)
+    if head_sha is None:
+        return None
+    cache_path = cache_dir / f"{prefix}{head_sha}"
+    if not cache_path.is_dir():
+        return None
+    
+    # Mark the entry as recently used for _prune_clone_cache
+    os.utime(cache_path)
+    return cache_path
+
+
+def _prune_clone_cache(cache_dir: Path, cache_path: Path) -> None:
+    """Remove outdated and least recently used entries from the clone cache.
+    
+    Args:
+        cache_dir: Directory the cached clones are kept in
+        cache_path: Entry just stored; older commits of the same repository are removed
+    """
+    prefix = cache_path.name.rsplit("-", 1)[0] + "-"
+    for entry in _list_cache_entries(cache_dir, prefix):
+        if entry != cache_path:
+            shutil.rmtree(entry, ignore_errors=True)
+    
+    entries = sorted(_list_cache_entries(cache_dir), key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[CLONE_CACHE_MAX_ENTRIES:]:
+        shutil.rmtree(entry, ignore_errors=True)
+
+
+def _store_cached_clone(
+    clone_path: Path,
+    repository_url: str,
+    target_dir: Optional[str],
+    full_history: bool,
+    analyze_only: bool
+) -> None:
+    """Keep a pristine copy of a fresh clone for later runs.
+    
+    Failing to store the copy never fails the clone.
+    
+    Args:
+        clone_path: Path of the fresh clone
+        repository_url: The URL of the repository
+        target_dir: Directory the repository is cloned under
+        full_history: Whether the clone has full history
+        analyze_only: Whether the clone is a treeless analyze-only clone
+    """
+    cache_dir = get_cache_dir(target_dir)
+    temp_dir = None
+    try:
+        head_sha = subprocess.run(
+            ["git", "-C", str(clone_path), "rev-parse", "HEAD"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True
+        ).stdout.strip()
+        cache_path = cache_dir / f"{_cache_entry_prefix(repository_url, full_history, analyze_only)}{head_sha}"
+        if cache_path.exists():
+            return
+        
+        # Copy into a temporary directory first so that an interrupted copy
+        # never leaves a partial cache entry behind
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=cache_dir, prefix=f"{cache_path.name}.tmp-")
+        fork_workspace(clone_path, Path(temp_dir) / "clone")
+        try:
+            os.replace(Path(temp_dir) / "clone", cache_path)
+        except OSError:
+            # Another clone of the same repository populated the cache first
+            if not cache_path.exists():
+                raise
+        _prune_clone_cache(cache_dir, cache_path)
+    except (OSError, subprocess.SubprocessError):
+        pass
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def clone_repository(
+    repository_url: str,
+    target_dir: Optional[str] = "./workspace/",
+    full_history: bool = False,
+    analyze_only: bool = False,
+    use_cache: Optional[bool] = None
+) -> dict[str, str]:
     """Clone a git repository to a local directory.
     
+    By default a shallow, single-branch, blob-filtered clone is performed
+    over git protocol v2. Pass ``full_history=True`` to fetch the full history,
+    or ``analyze_only=True`` for a treeless clone with no working tree whose
+    files are materialized on demand with checkout_paths.
+    
+    With the clone cache enabled, each fresh clone is also kept as a pristine
+    copy under ``<target_dir>/.cache/clones/``. A later clone of the same
+    repository asks the remote for its HEAD with ``git ls-remote`` and, if
+    that commit is cached, forks the workspace from the copy with
+    copy-on-write file copies instead of cloning.
+    
     Args:
         repository_url: The URL of the repository to clone
         target_dir: Optional target directory. If not provided, uses repository name
+        full_history: Whether to perform a full clone instead of a shallow one
+        analyze_only: Whether to perform a treeless clone without checkout
+        use_cache: Whether to use the clone cache; defaults to the CLONE_CACHE
+            environment variable
         
     Returns:
         Dictionary with 'success', 'path', and 'message' keys
@@ -29,16 +335,9 @@ def clone_repository(repository_url: str, target_dir: Optional[str] = "./workspa
             "message": "Repository URL cannot be empty"
         }
     
-    # Extract repository name from URL if target_dir not provided
-    parsed_url = urlparse(repository_url)
-    repo_name = os.path.basename(parsed_url.path)
-    if repo_name.endswith('.git'):
-        repo_name = repo_name[:-4]
-    if not repo_name:
-        repo_name = "cloned_repo"
-    
-    # Convert to Path object
-    clone_path = Path(target_dir).resolve() / repo_name
+    if use_cache is None:
+        use_cache = CLONE_CACHE_ENABLED
+    clone_path = get_clone_path(repository_url, target_dir, full_history, analyze_only)
 
     # Check if directory already exists
     if clone_path.exists():
@@ -49,15 +348,39 @@ def clone_repository(repository_url: str, target_dir: Optional[str] = "./workspa
         }
     
     try:
-        # Clone the repository
-        result = subprocess.run(
-            ["git", "clone", repository_url, str(clone_path)],
-            capture_output=True,
+        # Fork a new workspace from the cached clone of the current remote HEAD
+        if use_cache:
+            cache_path = _find_cached_clone(repository_url, target_dir, full_history, analyze_only)
+            if cache_path is not None:
+                fork_workspace(cache_path, clone_path)
+                return {
+                    "success": True,
+                    "path": str(clone_path),
+                    "message": f"Created {clone_path} from cached clone of repository"
+                }
+        
+        # Clone the repository. Progress output is suppressed and stdout is
+        # discarded; only stderr is piped back for error reporting.
+        if analyze_only:
+            clone_options = ANALYZE_ONLY_CLONE_OPTIONS
+        elif full_history:
+            clone_options = []
+        else:
+            clone_options = SHALLOW_CLONE_OPTIONS
+        subprocess.run(
+            ["git", "-c", "protocol.version=2", "clone", "--quiet", *clone_options, repository_url, str(clone_path)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
             text=True,
             check=True,
             timeout=300  # 5 minute timeout
         )
         
+        if use_cache:
+            _store_cached_clone(clone_path, repository_url, target_dir, full_history, analyze_only)
+        
         return {
             "success": True,
             "path": str(clone_path),
@@ -83,3 +406,56 @@ def clone_repository(repository_url: str, target_dir: Optional[str] = "./workspa
             "path": str(clone_path),
             "message": f"Unexpected error: {str(e)}"
         }
+
+
+def checkout_paths(clone_path: str, paths: list[str]) -> None:
+    """Materialize individual files from HEAD into a clone without a working tree.
+    
+    Used with analyze-only clones: git fetches only the trees and blobs needed
+    for the requested paths. Paths that do not exist at HEAD are skipped. The
+    files are written by git checkout, so executable bits and symlinks are
+    kept as they are in the repository.
+    
+    Args:
+        clone_path: Path to the cloned repository
+        paths: Paths relative to the repository root
+        
+    Raises:
+        subprocess.CalledProcessError: If a git command fails
+        subprocess.TimeoutExpired: If a git command does not finish in time
+    """
+    if not paths:
+        return
+    git_env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    
+    # List the requested paths that exist at HEAD as files or symlinks
+    result = subprocess.run(
+        ["git", "--literal-pathspecs", "-C", clone_path, "ls-tree", "-z", "HEAD", "--", *paths],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=git_env,
+        text=True,
+        check=True,
+        timeout=300  # 5 minute timeout
+    )
+    existing_paths = []
+    for entry in result.stdout.split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        if info.split()[1] == "blob":
+            existing_paths.append(path)
+    if not existing_paths:
+        return
+    
+    # Check out all of them with one command so their blobs are fetched in one batch
+    subprocess.run(
+        ["git", "--literal-pathspecs", "-C", clone_path, "checkout", "HEAD", "--", *existing_paths],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=git_env,
+        check=True,
+        timeout=300  # 5 minute timeout
+    )
@@ -0,0 +1,69 @@
+"""Disk cache for LLM Dockerfile conversions."""
+
+import hashlib
+import time
+from pathlib import Path
+from typing import Optional
+from agent.tools.docker_tools import write_text_atomic
+
+# Responses are kept next to the pristine clones, one file per cache key
+LLM_CACHE_DIR = Path("./workspace/.cache/llm")
+
+# Cached responses older than this are ignored and regenerated
+LLM_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+def get_llm_cache_key(model_id: str, *prompts: str) -> str:
+    """Compute the cache key for an LLM request.
+
+    The key covers the model and the full prompts, so editing either the
+    prompt templates or their inputs never returns a stale response.
+
+    Args:
+        model_id: Identifier of the model the request is sent to
+        prompts: Prompts sent to the model, in order
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    digest = hashlib.sha256(model_id.encode("utf-8"))
+    for prompt in prompts:
+        # Length-prefix each part so different splits never collide
+        data = prompt.encode("utf-8")
+        digest.update(b"%d:" % len(data))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def get_cached_llm_response(cache_key: str) -> Optional[str]:
+    """Return a cached LLM response if a fresh one exists.
+
+    Args:
+        cache_key: Key returned by get_llm_cache_key
+
+    Returns:
+        The cached response, or None if it is missing or expired
+    """
+    cache_file = LLM_CACHE_DIR / f"{cache_key}.txt"
+    try:
+        if time.time() - cache_file.stat().st_mtime > LLM_CACHE_TTL_SECONDS:
+            return None
+        return cache_file.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def cache_llm_response(cache_key: str, response: str) -> None:
+    """Store an LLM response for later identical requests.
+
+    Failing to write the cache never fails the conversion.
+
+    Args:
+        cache_key: Key returned by get_llm_cache_key
+        response: Response content to cache
+    """
+    try:
+        LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(LLM_CACHE_DIR / f"{cache_key}.txt", response)
+    except OSError:
+        pass
@@ -1,16 +1,126 @@
 """Tools for LLM operations."""
 
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import re
+from functools import lru_cache
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_aws import ChatBedrockConverse 
-import boto3
+from agent.tools.docker_tools import is_multi_stage_dockerfile
+from agent.tools.llm_cache import get_llm_cache_key, get_cached_llm_response, cache_llm_response
 
+# Bedrock model used for conversions; Haiku unless overridden with BEDROCK_MODEL_ID
+BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
 
+# Region of the Bedrock endpoints; BEDROCK_REGION wins over the usual AWS_REGION
+BEDROCK_REGION = os.getenv("BEDROCK_REGION") or os.getenv("AWS_REGION") or "us-east-1"
 
+# (model, region) pairs Bedrock serves with latency-optimized inference; other
+# requests reject the performanceConfig, so it is only sent for these
+_LATENCY_OPTIMIZED_MODELS = frozenset({
+    ("anthropic.claude-3-5-haiku-20241022-v1:0", "us-east-2"),
+    ("us.anthropic.claude-3-5-haiku-20241022-v1:0", "us-east-2"),
+})
+
+# System prompts for a first conversion and for a retry after a failed validation
+_SYSTEM_PROMPT = """You are an expert Docker engineer. Your task is to convert a single-stage Dockerfile to a multi-stage Dockerfile.
+
+Important requirements:
+1. Create a build stage that uses the appropriate base image based on the build_platform provided
+2. Use the same version/configuration from the existing Dockerfile in the build stage
+3. Keep the runtime stage EXACTLY as it is in the original Dockerfile - do not make major changes
+4. Only copy necessary artifacts from the build stage to the runtime stage
+5. Ensure the final image is optimized and follows Docker best practices
+6. Preserve all original functionality, environment variables, and configurations from the runtime stage
+
+Return ONLY the complete multi-stage Dockerfile content, without any explanations or markdown formatting."""
+
+_RETRY_SYSTEM_PROMPT = """You are an expert Docker engineer. Your task is to fix a multi-stage Dockerfile that failed validation.
+
+CRITICAL: This is a RETRY attempt. The previous Dockerfile you generated failed validation. You MUST:
+1. Carefully read and understand the validation error message
+2. Identify the specific issues causing the validation failure
+3. Fix ALL issues mentioned in the error
+4. Do NOT repeat the same mistakes from the previous attempt
+5. Generate a completely different, corrected Dockerfile that addresses the validation errors
+
+Important requirements:
+1. Create a build stage that uses the appropriate base image based on the build_platform provided
+2. Use the same version/configuration from the existing Dockerfile in the build stage
+3. Keep the runtime stage EXACTLY as it is in the original Dockerfile - do not make major changes
+4. Only copy necessary artifacts from the build stage to the runtime stage
+5. Ensure the final image is optimized and follows Docker best practices
+6. Preserve all original functionality, environment variables, and configurations from the runtime stage
+7. Fix any syntax errors, missing dependencies, incorrect paths, or build stage issues identified in the validation error
+
+Return ONLY the complete corrected multi-stage Dockerfile content, without any explanations or markdown formatting."""
+
+# Build configuration section of the user prompt, with and without a buildAs block
+_BUILD_AS_CONFIG_SECTION = """
+Build Configuration from buildAs block: Use the below details to configure the build stage base image 
+{build_as_config}
+
+Use the specific versions and configurations from the buildAs block above (e.g., pythonVersion, gradleImage, jdkVersionMajor) to determine the exact base image and versions for the build stage."""
+
+_BUILD_PLATFORM_SECTION = "\nBuild Platform: {build_platform}\nUse the appropriate base image for {build_platform} based on the existing Dockerfile."
+
+# User prompts for a first conversion and for a retry; the validation error
+# goes at the top of a retry prompt
+_USER_PROMPT = """Convert the following Dockerfile to a multi-stage build.
+{build_config_section}
+
+Original Dockerfile:
+```
+{dockerfile_content}
+```
+
+Create a multi-stage Dockerfile with:
+1. A build stage that uses the appropriate base image and versions based on the buildAs configuration above
+2. A runtime stage that keeps the existing runtime stage as-is (no major changes)
+
+Return the complete multi-stage Dockerfile:"""
+
+_RETRY_USER_PROMPT = """🚨 RETRY ATTEMPT - PREVIOUS DOCKERFILE FAILED VALIDATION 🚨
+
+CRITICAL VALIDATION ERROR (MUST FIX):
+```
+{validation_error}
+```
+
+The Dockerfile below failed validation with the error above. You MUST fix all issues mentioned in the error.
+
+{build_config_section}
+
+Current Dockerfile (that failed validation):
+```
+{dockerfile_content}
+```
+
+TASK: Fix the Dockerfile above by addressing ALL issues in the validation error. Generate a corrected multi-stage Dockerfile that:
+1. Fixes all errors mentioned in the validation error message
+2. Uses a build stage with the appropriate base image and versions based on the buildAs configuration
+3. Keeps the runtime stage as-is (no major changes) but fixes any errors
+4. Ensures all syntax is correct, all dependencies are present, and all paths are valid
+
+Return the complete corrected multi-stage Dockerfile:"""
+
+# Output token budget for a conversion: about twice the input Dockerfile
+# (~3 characters per token), bounded by a floor for short files and by the
+# model's output limit
+_MIN_OUTPUT_TOKENS = 1024
+_MAX_OUTPUT_TOKENS = 4096
+
+# Markdown code fence around a whole response: an opening ```/```dockerfile line
+# and, if present, a closing ``` on its own line
+_CODE_FENCE_PATTERN = re.compile(r'```[^\n]*\n?(.*?)(?:(?<![^\n])[^\S\n]*```[^\S\n]*)?\Z', re.DOTALL)
+
+
+
+@lru_cache(maxsize=1)
 def get_gemini_model():
     """Initialize and return a Gemini LLM model.
     
+    The model is created once and reused, so conversions and retries share its
+    HTTP connections. A missing API key is not cached and raises on every call.
+    
     Returns:
         ChatGoogleGenerativeAI instance configured with gemini-2.5-flash-lite
     """
@@ -19,22 +129,54 @@ def get_gemini_model():
     if not api_key:
         raise ValueError("GOOGLE_API_KEY environment variable is not set. Please set it in your .env file.")
     
+    # Imported here since the Google client stack is heavy and only needed for Gemini
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    
     return ChatGoogleGenerativeAI(
         model="gemini-2.5-flash-lite",
         temperature=0.1  # Lower temperature for more deterministic output
     )
 
+@lru_cache(maxsize=1)
 def get_anthorpic_model():
+    """Initialize and return the Bedrock Claude model.
+    
+    The boto3 clients and the model are built once and reused by every
+    conversion and retry.
+    
+    Returns:
+        ChatBedrockConverse instance for BEDROCK_MODEL_ID in BEDROCK_REGION
+    """
+    # Imported here so cached and rule-based conversions never load boto3/botocore
+    import boto3
+    from botocore.config import Config
+    from langchain_aws import ChatBedrockConverse
+    
+    # One session resolves credentials and endpoints for both clients. A
+    # conversion can take longer than botocore's 60s default read timeout, and
+    # throttling is retried with backoff instead of failing the attempt
+    session = boto3.Session(region_name=BEDROCK_REGION)
+    runtime_config = Config(
+        read_timeout=120,
+        retries={"mode": "adaptive", "total_max_attempts": 3},
+        tcp_keepalive=True
+    )
+    
     # bedrock_client = boto3.client("bedrock-runtime", region_name="us-east-1")
-    client = boto3.client("bedrock-runtime", region_name="us-east-1")
-    bedrock_client = boto3.client("bedrock", region_name="us-east-1")
+    client = session.client("bedrock-runtime", config=runtime_config)
+    bedrock_client = session.client("bedrock")
     llm = ChatBedrockConverse(
-            # model="anthropic.claude-3-haiku-20240307-v1:0",
-            model = "anthropic.claude-3-sonnet-20240229-v1:0",
+            # model="anthropic.claude-3-sonnet-20240229-v1:0",
+            model=BEDROCK_MODEL_ID,
             temperature=0,
             max_tokens=None,
             client=client,
-            bedrock_client=bedrock_client
+            bedrock_client=bedrock_client,
+            performance_config=(
+                {"latency": "optimized"}
+                if (BEDROCK_MODEL_ID, BEDROCK_REGION) in _LATENCY_OPTIMIZED_MODELS
+                else None
+            )
         )
 
     return llm
@@ -57,131 +199,79 @@ def convert_dockerfile_to_multi_stage(
     Returns:
         Updated multi-stage Dockerfile content
     """
-    # model = get_gemini_model()
-    # For retries, use slightly higher temperature to encourage variation
-   
-    model = get_anthorpic_model()
+    # Nothing to convert and no error to fix, so skip the LLM round-trip
+    if not validation_error and is_multi_stage_dockerfile(dockerfile_content):
+        return dockerfile_content
     
     # Adjust system prompt based on whether this is a retry
-    if validation_error:
-        system_prompt = """You are an expert Docker engineer. Your task is to fix a multi-stage Dockerfile that failed validation.
-
-CRITICAL: This is a RETRY attempt. The previous Dockerfile you generated failed validation. You MUST:
-1. Carefully read and understand the validation error message
-2. Identify the specific issues causing the validation failure
-3. Fix ALL issues mentioned in the error
-4. Do NOT repeat the same mistakes from the previous attempt
-5. Generate a completely different, corrected Dockerfile that addresses the validation errors
-
-Important requirements:
-1. Create a build stage that uses the appropriate base image based on the build_platform provided
-2. Use the same version/configuration from the existing Dockerfile in the build stage
-3. Keep the runtime stage EXACTLY as it is in the original Dockerfile - do not make major changes
-4. Only copy necessary artifacts from the build stage to the runtime stage
-5. Ensure the final image is optimized and follows Docker best practices
-6. Preserve all original functionality, environment variables, and configurations from the runtime stage
-7. Fix any syntax errors, missing dependencies, incorrect paths, or build stage issues identified in the validation error
-
-Return ONLY the complete corrected multi-stage Dockerfile content, without any explanations or markdown formatting."""
-    else:
-        system_prompt = """You are an expert Docker engineer. Your task is to convert a single-stage Dockerfile to a multi-stage Dockerfile.
-
-Important requirements:
-1. Create a build stage that uses the appropriate base image based on the build_platform provided
-2. Use the same version/configuration from the existing Dockerfile in the build stage
-3. Keep the runtime stage EXACTLY as it is in the original Dockerfile - do not make major changes
-4. Only copy necessary artifacts from the build stage to the runtime stage
-5. Ensure the final image is optimized and follows Docker best practices
-6. Preserve all original functionality, environment variables, and configurations from the runtime stage
-
-Return ONLY the complete multi-stage Dockerfile content, without any explanations or markdown formatting."""
+    system_prompt = _RETRY_SYSTEM_PROMPT if validation_error else _SYSTEM_PROMPT
     
     # Build the build configuration section
-    build_config_section = ""
     if build_as_config:
-        build_config_section = f"""
-Build Configuration from buildAs block: Use the below details to configure the build stage base image 
-{build_as_config}
-
-Use the specific versions and configurations from the buildAs block above (e.g., pythonVersion, gradleImage, jdkVersionMajor) to determine the exact base image and versions for the build stage."""
+        build_config_section = _BUILD_AS_CONFIG_SECTION.format(build_as_config=build_as_config)
     else:
-        build_config_section = f"\nBuild Platform: {build_platform}\nUse the appropriate base image for {build_platform} based on the existing Dockerfile."
+        build_config_section = _BUILD_PLATFORM_SECTION.format(build_platform=build_platform)
     
     # Build user prompt - put validation error at the TOP if retrying
     if validation_error:
-        user_prompt = f"""🚨 RETRY ATTEMPT - PREVIOUS DOCKERFILE FAILED VALIDATION 🚨
-
-CRITICAL VALIDATION ERROR (MUST FIX):
-```
-{validation_error}
-```
-
-The Dockerfile below failed validation with the error above. You MUST fix all issues mentioned in the error.
-
-{build_config_section}
-
-Current Dockerfile (that failed validation):
-```
-{dockerfile_content}
-```
-
-TASK: Fix the Dockerfile above by addressing ALL issues in the validation error. Generate a corrected multi-stage Dockerfile that:
-1. Fixes all errors mentioned in the validation error message
-2. Uses a build stage with the appropriate base image and versions based on the buildAs configuration
-3. Keeps the runtime stage as-is (no major changes) but fixes any errors
-4. Ensures all syntax is correct, all dependencies are present, and all paths are valid
-
-Return the complete corrected multi-stage Dockerfile:"""
+        user_prompt = _RETRY_USER_PROMPT.format(
+            validation_error=validation_error,
+            build_config_section=build_config_section,
+            dockerfile_content=dockerfile_content
+        )
     else:
-        user_prompt = f"""Convert the following Dockerfile to a multi-stage build.
-{build_config_section}
-
-Original Dockerfile:
-```
-{dockerfile_content}
-```
-
-Create a multi-stage Dockerfile with:
-1. A build stage that uses the appropriate base image and versions based on the buildAs configuration above
-2. A runtime stage that keeps the existing runtime stage as-is (no major changes)
-
-Return the complete multi-stage Dockerfile:"""
+        user_prompt = _USER_PROMPT.format(
+            build_config_section=build_config_section,
+            dockerfile_content=dockerfile_content
+        )
+    
+    # First conversions are deterministic (temperature 0), so an identical
+    # request is answered from the cache; retries always go to the model
+    cache_key = None
+    if not validation_error:
+        cache_key = get_llm_cache_key(BEDROCK_MODEL_ID, system_prompt, user_prompt)
+        cached = get_cached_llm_response(cache_key)
+        if cached is not None:
+            return cached
+    
+    # model = get_gemini_model()
+    # For retries, use slightly higher temperature to encourage variation
+   
+    model = get_anthorpic_model()
     
     messages = [
         SystemMessage(content=system_prompt),
         HumanMessage(content=user_prompt)
     ]
     
-    response = model.invoke(messages)
+    max_tokens = min(max(2 * len(dockerfile_content) // 3, _MIN_OUTPUT_TOKENS), _MAX_OUTPUT_TOKENS)
+    response = model.invoke(messages, max_tokens=max_tokens)
     
     # Handle both string and list content (Bedrock/Anthropic can return list)
     if isinstance(response.content, list):
-        # Extract text from content blocks - handle both dict and string formats
-        text_parts = []
-        for block in response.content:
-            if block:
-                if isinstance(block, dict):
-                    # Extract 'text' field from dictionary blocks
-                    text_parts.append(block.get('text', ''))
-                else:
-                    # Handle string blocks
-                    text_parts.append(str(block))
-        content = ''.join(text_parts)
+        # Extract text from content blocks - the 'text' field of dictionary
+        # blocks, string blocks as-is
+        content = ''.join(
+            block.get('text', '') if isinstance(block, dict) else str(block)
+            for block in response.content
+            if block
+        )
     else:
         content = str(response.content)
     
     content = content.strip()
     
     # Remove markdown code blocks if present
-    if content.startswith("```"):
-        # Remove opening ```dockerfile or ```
-        lines = content.split('\n')
-        if lines[0].startswith('```'):
-            lines = lines[1:]
-        # Remove closing ```
-        if lines and lines[-1].strip() == '```':
-            lines = lines[:-1]
-        content = '\n'.join(lines)
-    
-    return content.strip()
+    fenced = _CODE_FENCE_PATTERN.match(content)
+    if fenced:
+        content = fenced.group(1)
+    
+    content = content.strip()
+    
+    # Only cache complete conversions; a response cut off by max_tokens, or one
+    # that is not a multi-stage Dockerfile, is regenerated next time
+    finished = response.response_metadata.get("stopReason") == "end_turn"
+    if cache_key is not None and finished and is_multi_stage_dockerfile(content):
+        cache_llm_response(cache_key, content)
+    return content
 
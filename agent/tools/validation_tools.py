@@ -1,4 +1,13 @@
-from urllib.parse import urlparse
+import re
+
+# Schemes accepted for repository URLs
+VALID_SCHEMES = ("http", "https", "git", "ssh")
+_VALID_SCHEME_SET = frozenset(VALID_SCHEMES)
+
+# URL scheme as urllib.parse detects it: leading control characters and
+# spaces are skipped, and tabs and newlines anywhere are ignored
+_URL_SCHEME_PATTERN = re.compile(r'[\x00-\x20]*([A-Za-z][A-Za-z0-9+.\-]*):')
+_IGNORED_URL_CHARS = str.maketrans("", "", "\t\r\n")
 
 def validate_repository_url(repository_url: str) -> dict[str, bool | str]:
     """Validate if a repository URL is well-formed.
@@ -15,21 +24,20 @@ def validate_repository_url(repository_url: str) -> dict[str, bool | str]:
             "message": "Repository URL cannot be empty"
         }
     
-    parsed = urlparse(repository_url)
+    scheme_match = _URL_SCHEME_PATTERN.match(repository_url.translate(_IGNORED_URL_CHARS))
     
     # Check if it's a valid URL
-    if not parsed.scheme:
+    if not scheme_match:
         return {
             "valid": False,
             "message": "Repository URL must include a scheme (http://, https://, or git@)"
         }
     
     # Check for common git URL patterns
-    valid_schemes = ["http", "https", "git", "ssh"]
-    if parsed.scheme not in valid_schemes and not repository_url.startswith("git@"):
+    if scheme_match.group(1).lower() not in _VALID_SCHEME_SET and not repository_url.startswith("git@"):
         return {
             "valid": False,
-            "message": f"Invalid URL scheme. Must be one of: {', '.join(valid_schemes)} or git@ format"
+            "message": f"Invalid URL scheme. Must be one of: {', '.join(VALID_SCHEMES)} or git@ format"
         }
     
     return {
@@ -1,5 +1,6 @@
 """Main entry point for the repository cloning agent."""
 
+import asyncio
 import sys
 import os
 from typing import Optional
@@ -10,29 +11,25 @@ from agent.state import AgentState
 # Load environment variables from .env file if it exists
 try:
     from dotenv import load_dotenv
-    env_path = Path(__file__).parent / ".env"
-    if env_path.exists():
-        load_dotenv(env_path)
+    # load_dotenv skips a missing file, so no separate exists() check
+    load_dotenv(Path(__file__).parent / ".env")
 except ImportError:
     # dotenv is optional, continue without it
     pass
 
 
-def run_agent(repository_url: str, dockerfile_validation_max_retries: int = 2) -> dict:
-    """Run the repository cloning agent.
-    
-    Args:
-        repository_url: The URL of the repository to clone
-        dockerfile_validation_max_retries: Maximum number of retries for dockerfile validation (default: 2)
-        
-    Returns:
-        Final state dictionary
-    """
-    # Initialize state
-    initial_state: AgentState = {
+def _initial_state(
+    repository_url: str,
+    dockerfile_validation_max_retries: int = 2,
+    analyze_only: bool = False
+) -> AgentState:
+    """Build the initial workflow state for a repository."""
+    return {
         "messages": [HumanMessage(content=f"Clone repository: {repository_url}")],
         "repository_url": repository_url,
         "clone_path": None,
+        "need_full_history": None,
+        "analyze_only": analyze_only,
         "status": "pending",
         "error": None,
         "via_cbs_file_content": None,
@@ -49,6 +46,87 @@ def run_agent(repository_url: str, dockerfile_validation_max_retries: int = 2) -
         "dockerfile_validation_error": None,
         "dockerfile_validation_passed": None
     }
+
+
+def _error_state(initial_state: AgentState, error: Exception) -> dict:
+    """Build the final state returned when the workflow itself fails."""
+    return {
+        "messages": initial_state["messages"],
+        "repository_url": initial_state["repository_url"],
+        "clone_path": None,
+        "status": "error",
+        "error": f"Workflow execution failed: {str(error)}"
+    }
+
+
+async def arun_agent(repository_url: str, dockerfile_validation_max_retries: int = 2, analyze_only: bool = False) -> dict:
+    """Run the repository cloning agent on the running event loop.
+    
+    Args:
+        repository_url: The URL of the repository to clone
+        dockerfile_validation_max_retries: Maximum number of retries for dockerfile validation (default: 2)
+        analyze_only: Only analyze the repository using a treeless clone, skipping all later steps (default: False)
+        
+    Returns:
+        Final state dictionary
+    """
+    # Initialize state
+    initial_state = _initial_state(repository_url, dockerfile_validation_max_retries, analyze_only)
+    
+    # Get the workflow
+    from agent.graph import create_workflow
+    workflow = create_workflow()
+    
+    # Run the workflow
+    try:
+        final_state = await workflow.ainvoke(initial_state)
+        return final_state
+    except Exception as e:
+        return _error_state(initial_state, e)
+
+
+async def arun_agents(repository_urls: list[str], dockerfile_validation_max_retries: int = 2, analyze_only: bool = False) -> list[dict]:
+    """Run the agent on several repositories concurrently.
+    
+    Each repository URL gets its own workspace, so the runs never touch each
+    other's files. A URL listed twice would share one workspace, so it is rejected.
+    
+    Args:
+        repository_urls: URLs of the repositories to process
+        dockerfile_validation_max_retries: Maximum number of retries for dockerfile validation (default: 2)
+        analyze_only: Only analyze the repositories, skipping all later steps (default: False)
+        
+    Returns:
+        Final state dictionaries, in the order of repository_urls
+        
+    Raises:
+        ValueError: If a repository URL is listed more than once
+    """
+    seen_urls = set()
+    for repository_url in repository_urls:
+        if repository_url.strip() in seen_urls:
+            raise ValueError(f"Repository URL listed more than once: {repository_url}")
+        seen_urls.add(repository_url.strip())
+    
+    return await asyncio.gather(*(
+        arun_agent(repository_url, dockerfile_validation_max_retries, analyze_only)
+        for repository_url in repository_urls
+    ))
+
+
+def run_agent(repository_url: str, dockerfile_validation_max_retries: int = 2, analyze_only: bool = False) -> dict:
+    """Run the repository cloning agent.
+    
+    Args:
+        repository_url: The URL of the repository to clone
+        dockerfile_validation_max_retries: Maximum number of retries for dockerfile validation (default: 2)
+        analyze_only: Only analyze the repository using a treeless clone, skipping all later steps (default: False)
+        
+    Returns:
+        Final state dictionary
+    """
+    # Initialize state
+    initial_state = _initial_state(repository_url, dockerfile_validation_max_retries, analyze_only)
     
     # Get the workflow
     from agent.graph import create_workflow
@@ -59,13 +137,7 @@ def run_agent(repository_url: str, dockerfile_validation_max_retries: int = 2) -
         final_state = workflow.invoke(initial_state)
         return final_state
     except Exception as e:
-        return {
-            "messages": initial_state["messages"],
-            "repository_url": repository_url,
-            "clone_path": None,
-            "status": "error",
-            "error": f"Workflow execution failed: {str(e)}"
-        }
+        return _error_state(initial_state, e)
 
 
 def main():
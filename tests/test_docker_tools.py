@@ -0,0 +1,155 @@
+"""Tests for docker_tools."""
+
+import asyncio
+import os
+import stat
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from agent.tools import docker_tools
+from agent.tools.docker_tools import ensure_buildx_builder, run_buildx_bake, try_mechanical_multi_stage
+
+BUILD_AS_CONFIG = "pythonVersion '3.7.9'"
+
+SIMPLE_DOCKERFILE = """FROM python:3.7-slim
+WORKDIR /app
+COPY requirements.txt .
+RUN pip install --no-cache-dir -r requirements.txt
+COPY . .
+CMD ["python", "app.py"]
+"""
+
+
+def convert(dockerfile_content: str, build_as_config: str = BUILD_AS_CONFIG):
+    return try_mechanical_multi_stage(dockerfile_content, "python-pypi", build_as_config)
+
+
+class TryMechanicalMultiStageTest(unittest.TestCase):
+    def test_converts_simple_dockerfile(self):
+        self.assertEqual(
+            convert(SIMPLE_DOCKERFILE),
+            "FROM python:3.7-slim AS build\n"
+            "RUN python -m venv /opt/venv\n"
+            'ENV PATH="/opt/venv/bin:$PATH"\n'
+            "WORKDIR /app\n"
+            "COPY requirements.txt .\n"
+            "RUN pip install --no-cache-dir -r requirements.txt\n"
+            "\n"
+            "FROM python:3.7-slim\n"
+            "COPY --from=build /opt/venv /opt/venv\n"
+            'ENV PATH="/opt/venv/bin:$PATH"\n'
+            "WORKDIR /app\n"
+            "COPY . .\n"
+            'CMD ["python", "app.py"]\n'
+        )
+
+    def test_accepts_debian_based_tags(self):
+        for tag in ("3.7", "3.7.9", "3.7-slim", "3.7-slim-buster", "3.7-buster", "3.7.9-slim-bullseye"):
+            with self.subTest(tag=tag):
+                dockerfile = SIMPLE_DOCKERFILE.replace("python:3.7-slim", f"python:{tag}")
+                self.assertIsNotNone(convert(dockerfile))
+
+    def test_build_stage_uses_runtime_image(self):
+        for image in ("python:3.7", "python:3.7-slim-buster", "docker.io/library/python:3.7.9-bullseye"):
+            with self.subTest(image=image):
+                converted = convert(SIMPLE_DOCKERFILE.replace("python:3.7-slim", image))
+                from_lines = [line for line in converted.splitlines() if line.startswith("FROM ")]
+                self.assertEqual(from_lines, [f"FROM {image} AS build", f"FROM {image}"])
+
+    def test_keeps_copies_not_repeated_later(self):
+        dockerfile = SIMPLE_DOCKERFILE.replace("COPY . .\n", "COPY app.py .\n")
+        converted = convert(dockerfile)
+        runtime_stage = converted.split("\n\n", 1)[1]
+        self.assertIn("COPY requirements.txt .\n", runtime_stage)
+
+    def test_rejects_non_debian_tags(self):
+        for tag in ("3.7-alpine", "3.7-alpine3.12", "3.7.9-alpine", "3.7-windowsservercore", "3.7-rc"):
+            with self.subTest(tag=tag):
+                dockerfile = SIMPLE_DOCKERFILE.replace("python:3.7-slim", f"python:{tag}")
+                self.assertIsNone(convert(dockerfile))
+
+    def test_rejects_python_version_mismatch(self):
+        self.assertIsNone(convert(SIMPLE_DOCKERFILE.replace("python:3.7-slim", "python:3.8-slim")))
+
+    def test_rejects_other_build_platforms(self):
+        self.assertIsNone(try_mechanical_multi_stage(SIMPLE_DOCKERFILE, "java-maven", BUILD_AS_CONFIG))
+        self.assertIsNone(convert(SIMPLE_DOCKERFILE, build_as_config=""))
+
+    def test_rejects_run_before_pip_install(self):
+        dockerfile = SIMPLE_DOCKERFILE.replace(
+            "RUN pip install",
+            "RUN apt-get update\nRUN pip install"
+        )
+        self.assertIsNone(convert(dockerfile))
+
+    def test_rejects_unsupported_pip_options(self):
+        self.assertIsNone(convert(SIMPLE_DOCKERFILE.replace("--no-cache-dir", "--user")))
+
+    def test_rejects_line_continuations(self):
+        dockerfile = SIMPLE_DOCKERFILE.replace(
+            "RUN pip install --no-cache-dir -r requirements.txt",
+            "RUN pip install --no-cache-dir \\\n    -r requirements.txt"
+        )
+        self.assertIsNone(convert(dockerfile))
+
+    def test_rejects_multi_stage_dockerfile(self):
+        dockerfile = "FROM python:3.7 AS base\n" + SIMPLE_DOCKERFILE
+        self.assertIsNone(convert(dockerfile))
+
+
+class RunBuildxBakeTest(unittest.TestCase):
+    def run_stub_bake(self, script: str):
+        """Run run_buildx_bake against a stub docker running the given shell script."""
+        with tempfile.TemporaryDirectory() as bin_dir:
+            stub = Path(bin_dir) / "docker"
+            stub.write_text(f"#!/bin/sh\n{script}")
+            stub.chmod(stub.stat().st_mode | stat.S_IEXEC)
+            with mock.patch.dict(os.environ, {"PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}"}):
+                started = time.monotonic()
+                result = asyncio.run(run_buildx_bake("docker-argo-bake.hcl", bin_dir, timeout=20))
+                return result, time.monotonic() - started
+
+    def test_stops_on_failed_to_solve(self):
+        for error_line in (
+            "ERROR: failed to solve: process did not complete successfully: exit code: 1",
+            'ERROR: target "app": failed to solve: process did not complete successfully: exit code: 1',
+        ):
+            with self.subTest(error_line=error_line):
+                result, elapsed = self.run_stub_bake(
+                    "echo '#5 [build 2/3] RUN pip install -r requirements.txt'\n"
+                    f"echo '{error_line}'\n"
+                    "sleep 30\n"
+                )
+                self.assertLess(elapsed, 10)
+                self.assertNotEqual(result.returncode, 0)
+                self.assertIn(error_line, result.stderr)
+
+    def test_waits_for_build_without_failure_line(self):
+        result, _ = self.run_stub_bake(
+            "echo '#5 0.1 pip: failed to solve dependencies'\n"
+            "sleep 1\n"
+            "echo done\n"
+        )
+        self.assertEqual(result.returncode, 0)
+        self.assertTrue(result.stderr.endswith("done\n"))
+
+class EnsureBuildxBuilderTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(docker_tools, _buildx_builder_ready=False, _buildx_builder_warmup=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_after_failed_setup(self):
+        prepare = mock.AsyncMock(side_effect=[False, True])
+        with mock.patch.object(docker_tools, "_prepare_buildx_builder", prepare):
+            self.assertIsNone(asyncio.run(ensure_buildx_builder()))
+            self.assertEqual(asyncio.run(ensure_buildx_builder()), docker_tools.BUILDX_BUILDER_NAME)
+            self.assertEqual(asyncio.run(ensure_buildx_builder()), docker_tools.BUILDX_BUILDER_NAME)
+        self.assertEqual(prepare.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()